@@ -0,0 +1,189 @@
+# backend/api/admin_routes.py
+"""
+Admin API routes: bulk user import and export, session revocation, request profiles
+"""
+
+import asyncio
+import csv
+import io
+import os
+import uuid
+from typing import List, Optional, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+
+from backend.database.storage import EXPORT_COLUMNS, get_storage
+from backend.database.connection import get_db
+from backend.models.user import ImportReport, ImportRowError, SessionRevocation, UserRegister
+from backend.utils.auth import hash_password, require_admin, revoke_sessions
+from backend.utils.hashing import password_hasher
+from backend.utils.profiling import PROFILE_TOKEN_TTL_SECONDS, issue_token, sampler
+from backend.utils.responses import ORJSON_OPTIONS, json_bytes
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "10000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+router = APIRouter(tags=["Admin"], dependencies=[Depends(require_admin)])
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _import_format(request: Request, requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    return "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+
+
+def _parse_rows(body: bytes, fmt: str) -> List[Tuple[int, Optional[dict], Optional[str]]]:
+    """(row number, fields, parse error) for every non-blank row"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import must be UTF-8")
+
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        return [(number, {k: (v or None) for k, v in row.items() if k}, None)
+                for number, row in enumerate(reader, start=1)]
+
+    rows = []
+    for number, line in enumerate((line for line in text.splitlines() if line.strip()), start=1):
+        try:
+            fields = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            rows.append((number, None, f"invalid JSON: {exc}"))
+            continue
+        if not isinstance(fields, dict):
+            rows.append((number, None, "expected a JSON object"))
+            continue
+        rows.append((number, fields, None))
+    return rows
+
+
+async def _hash_all(passwords: List[str]) -> List[str]:
+    # One hash per pool worker at a time, so logins keep getting queue slots during an import
+    limit = asyncio.Semaphore(password_hasher.workers)
+
+    async def hash_one(password: str) -> str:
+        async with limit:
+            return await hash_password(password)
+
+    return await asyncio.gather(*(hash_one(p) for p in passwords))
+
+
+@router.post("/users/import", response_model=ImportReport)
+async def import_users(request: Request, format: Optional[str] = Query(None, pattern="^(csv|ndjson)$")):
+    """Bulk-create users from CSV (header: name,email,password,company_name) or NDJSON"""
+    rows = _parse_rows(await request.body(), _import_format(request, format))
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {IMPORT_MAX_ROWS} rows per import"
+        )
+
+    failed: List[ImportRowError] = []
+    accepted: List[Tuple[int, UserRegister]] = []
+    seen = set()
+    for number, fields, error in rows:
+        if error:
+            failed.append(ImportRowError(row=number, errors=[error]))
+            continue
+        try:
+            user = UserRegister(**fields)
+        except ValidationError as exc:
+            failed.append(ImportRowError(
+                row=number, email=fields.get("email"),
+                errors=[f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()]
+            ))
+            continue
+        if user.email.lower() in seen:
+            failed.append(ImportRowError(row=number, email=user.email, errors=["duplicate email in import"]))
+            continue
+        seen.add(user.email.lower())
+        accepted.append((number, user))
+
+    hashes = await _hash_all([user.password for _, user in accepted])
+    records = [
+        (str(uuid.uuid4()), user.name, user.email, password_hash, user.company_name)
+        for (_, user), password_hash in zip(accepted, hashes)
+    ]
+
+    taken = set()
+    if records:
+        storage = get_storage()
+        async with storage.acquire() as db:
+            taken = set(await storage.bulk_insert_users(db, records))
+    for number, user in accepted:
+        if user.email in taken:
+            failed.append(ImportRowError(row=number, email=user.email, errors=["email already registered"]))
+
+    failed.sort(key=lambda e: e.row)
+    return json_bytes({
+        "imported": len(records) - len(taken),
+        "failed": [e.model_dump() for e in failed],
+    })
+
+
+def _encode_batch(batch: List[dict], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return b"".join(orjson.dumps(row, option=ORJSON_OPTIONS) + b"\n" for row in batch)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in batch:
+        writer.writerow([
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in (row[column] for column in EXPORT_COLUMNS)
+        ])
+    return out.getvalue().encode()
+
+
+@router.get("/users/export")
+async def export_users(format: str = Query("ndjson", pattern="^(csv|ndjson)$")):
+    """Stream every user as NDJSON or CSV"""
+    storage = get_storage()
+
+    async def body():
+        if format == "csv":
+            yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+        async with storage.acquire(readonly=True) as db:
+            async for batch in storage.stream_users(db, EXPORT_BATCH_SIZE):
+                yield _encode_batch(batch, format)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
+@router.post("/users/{user_id}/revoke-sessions", response_model=SessionRevocation)
+async def revoke_user_sessions(user_id: str, db = Depends(get_db)):
+    """Invalidate every access and refresh token issued to a user"""
+    generation = await revoke_sessions(user_id, db)
+    if generation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return json_bytes({"user_id": user_id, "session_generation": generation})
+
+
+@router.post("/profiles/token")
+async def profile_token():
+    """X-Profile header value; requests sent with it are profiled until it expires"""
+    return json_bytes({"header": "X-Profile", "value": issue_token(), "expires_in": PROFILE_TOKEN_TTL_SECONDS})
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Profiles captured by the worker serving this request, newest first"""
+    return json_bytes([profile.summary() for profile in reversed(sampler.ring)])
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """One profile as collapsed stacks, ready for flamegraph.pl or speedscope"""
+    profile = sampler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found on this worker")
+    return PlainTextResponse(profile.collapsed())
@@ -3,56 +3,76 @@
 Authentication API routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from psycopg2.extras import RealDictCursor
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from datetime import timedelta
 import uuid
 
 from backend.database.connection import get_db
-from backend.models.user import UserRegister, UserLogin, UserResponse, Token, MessageResponse, TokenRefresh
+from backend.models.user import (
+    UserRegister, UserLogin, UserResponse, Token, MessageResponse, TokenRefresh,
+    EmailVerification, PasswordReset, PasswordResetConfirm
+)
 from backend.utils.auth import (
     hash_password, authenticate_user, create_access_token, create_refresh_token,
-    get_current_user, store_refresh_token, validate_refresh_token, 
-    revoke_refresh_token, update_last_login, get_user_by_email, 
-    get_user_by_id, UserInDB, ACCESS_TOKEN_EXPIRE_MINUTES
+    decode_token, get_current_user, store_refresh_token, revoke_refresh_token,
+    rotate_refresh_token, update_last_login, get_user_by_email, create_user,
+    check_session_generation, revoke_sessions, send_verification_email, send_password_reset_email,
+    redeem_action_token, mark_email_verified, reset_password,
+    UserInDB, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from backend.utils.action_tokens import PASSWORD_RESET, VERIFY_EMAIL
+from backend.utils.ratelimit import (
+    login_email_limit, login_ip_limit, password_reset_email_limit, require_hasher_capacity
 )
+from backend.utils.responses import conditional, json_bytes, no_store, preencoded, user_etag, user_json
+
+router = APIRouter(tags=["Authentication"])
+
+# Handlers return Response objects built by backend.utils.responses; response_model documents the shape
+LOGOUT_BODY = b'{"message":"Successfully logged out","success":true}'
+LOGOUT_ALL_BODY = b'{"message":"Logged out of all sessions","success":true}'
+TOKEN_VALID_BODY = b'{"message":"Token is valid","success":true}'
+EMAIL_VERIFIED_BODY = b'{"message":"Email verified","success":true}'
+VERIFICATION_SENT_BODY = b'{"message":"Verification email sent","success":true}'
+# Same reply whether or not the account exists
+PASSWORD_RESET_SENT_BODY = b'{"message":"If that email is registered, a reset link is on its way","success":true}'
+PASSWORD_RESET_DONE_BODY = b'{"message":"Password updated; please log in again","success":true}'
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+def _invalid_link() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired link")
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db = Depends(get_db)):
+async def register(user_data: UserRegister, db = Depends(get_db)):
     """Register a new user"""
-    existing_user = get_user_by_email(user_data.email, db)
+    existing_user = await get_user_by_email(user_data.email, db)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    password_hash = hash_password(user_data.password)
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    user_id = str(uuid.uuid4())
-    
-    cursor.execute(
-        """
-        INSERT INTO users (id, name, email, password_hash, company_name, role, is_verified, is_active)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id, name, email, company_name, role, is_verified, is_active, created_at, last_login
-        """,
-        (user_id, user_data.name, user_data.email, password_hash, 
-         user_data.company_name, "user", False, True)
+    password_hash = await hash_password(user_data.password)
+    new_user = await create_user(
+        str(uuid.uuid4()), user_data.name, user_data.email, password_hash,
+        user_data.company_name, db
     )
+    if new_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
-    new_user = cursor.fetchone()
-    cursor.close()
-    db.commit()
-    
-    return UserResponse(**dict(new_user))
+    send_verification_email(new_user)
+    return user_json(new_user, status.HTTP_201_CREATED)
 
-@router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db = Depends(get_db)):
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(login_ip_limit), Depends(login_email_limit), Depends(require_hasher_capacity)],
+)
+async def login(user_credentials: UserLogin, db = Depends(get_db)):
     """Login with email and password"""
-    user = authenticate_user(user_credentials.email, user_credentials.password, db)
+    user = await authenticate_user(user_credentials.email, user_credentials.password, db)
     
     if not user:
         raise HTTPException(
@@ -64,69 +84,108 @@ def login(user_credentials: UserLogin, db = Depends(get_db)):
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is inactive")
     
-    update_last_login(user.id, db)
+    update_last_login(user.id)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.id, "email": user.email},
-        expires_delta=access_token_expires
-    )
+    claims = {"sub": user.id, "email": user.email, "gen": user.session_generation}
+    access_token = create_access_token(data=claims, expires_delta=access_token_expires)
     
-    refresh_token = create_refresh_token(data={"sub": user.id, "email": user.email})
-    store_refresh_token(user.id, refresh_token, db)
+    refresh_token = create_refresh_token(data=claims)
+    await store_refresh_token(user.id, refresh_token, db)
     
-    return Token(access_token=access_token, refresh_token=refresh_token, token_type="bearer")
+    return no_store(json_bytes({"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}))
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(token_data: TokenRefresh, db = Depends(get_db)):
+async def refresh_token(token_data: TokenRefresh, db = Depends(get_db)):
     """Refresh access token"""
-    user_id = validate_refresh_token(token_data.refresh_token, db)
+    claims = decode_token(token_data.refresh_token, expected_type="refresh")
+    check_session_generation(claims)
+    # Revoking sessions also revokes refresh tokens, so a token that rotates still has the current generation
+    new_refresh_token = create_refresh_token(
+        data={"sub": claims.user_id, "email": claims.email, "gen": claims.generation}
+    )
+    email, reused = await rotate_refresh_token(
+        claims.user_id, token_data.refresh_token, new_refresh_token, db
+    )
     
-    if not user_id:
+    if reused:
+        # The rotation revoked the refresh tokens; bumping the generation also rejects access tokens already issued
+        await revoke_sessions(claims.user_id, db)
+        print(f"⚠️ Refresh token reuse detected for user {claims.user_id}; all sessions revoked")
+    
+    if email is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_id(user_id, db)
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
-    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id, "email": user.email},
+        data={"sub": claims.user_id, "email": email, "gen": claims.generation},
         expires_delta=access_token_expires
     )
     
-    new_refresh_token = create_refresh_token(data={"sub": user.id, "email": user.email})
-    revoke_refresh_token(token_data.refresh_token, db)
-    store_refresh_token(user.id, new_refresh_token, db)
-    
-    return Token(access_token=access_token, refresh_token=new_refresh_token, token_type="bearer")
+    return no_store(json_bytes({"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}))
 
 @router.post("/logout", response_model=MessageResponse)
-def logout(token_data: TokenRefresh, db = Depends(get_db)):
+async def logout(token_data: TokenRefresh, db = Depends(get_db)):
     """Logout user"""
-    revoke_refresh_token(token_data.refresh_token, db)
-    return MessageResponse(message="Successfully logged out", success=True)
+    await revoke_refresh_token(token_data.refresh_token, db)
+    return preencoded(LOGOUT_BODY)
+
+@router.post("/logout-all", response_model=MessageResponse)
+async def logout_all(current_user: UserInDB = Depends(get_current_user), db = Depends(get_db)):
+    """Log out of every session, this one included"""
+    await revoke_sessions(current_user.id, db)
+    return preencoded(LOGOUT_ALL_BODY)
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user: UserInDB = Depends(get_current_user)):
-    """Get current user's profile"""
-    return UserResponse(
-        id=current_user.id,
-        name=current_user.name,
-        email=current_user.email,
-        company_name=current_user.company_name,
-        role=current_user.role,
-        is_verified=current_user.is_verified,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at,
-        last_login=current_user.last_login
-    )
+async def get_current_user_profile(request: Request, current_user: UserInDB = Depends(get_current_user)):
+    """Get current user's profile; answers If-None-Match with 304 while the profile is unchanged"""
+    return conditional(request, user_etag(current_user), lambda: user_json(current_user))
 
 @router.get("/verify-token", response_model=MessageResponse)
-def verify_token(current_user: UserInDB = Depends(get_current_user)):
+async def verify_token(current_user: UserInDB = Depends(get_current_user)):
     """Verify if token is valid"""
-    return MessageResponse(message="Token is valid", success=True)
+    return preencoded(TOKEN_VALID_BODY)
+
+@router.post("/verify-email", response_model=MessageResponse)
+async def verify_email(data: EmailVerification, db = Depends(get_db)):
+    """Confirm an email address with the token from the verification link"""
+    user = await redeem_action_token(VERIFY_EMAIL, data.token, db)
+    if user is None:
+        raise _invalid_link()
+    await mark_email_verified(user.id, db)
+    return preencoded(EMAIL_VERIFIED_BODY)
+
+@router.post("/verify-email/resend", response_model=MessageResponse)
+async def resend_verification_email(current_user: UserInDB = Depends(get_current_user)):
+    """Send a fresh verification link to the current user"""
+    if current_user.is_verified:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already verified")
+    send_verification_email(current_user)
+    return preencoded(VERIFICATION_SENT_BODY)
+
+@router.post(
+    "/password-reset",
+    response_model=MessageResponse,
+    dependencies=[Depends(login_ip_limit), Depends(password_reset_email_limit)],
+)
+async def request_password_reset(data: PasswordReset, background_tasks: BackgroundTasks):
+    """Email a reset link. The lookup runs after the reply is sent, so the reply takes
+    the same time whether or not the account exists"""
+    background_tasks.add_task(send_password_reset_email, data.email)
+    return preencoded(PASSWORD_RESET_SENT_BODY)
+
+@router.post(
+    "/password-reset/confirm",
+    response_model=MessageResponse,
+    dependencies=[Depends(require_hasher_capacity)],
+)
+async def confirm_password_reset(data: PasswordResetConfirm, db = Depends(get_db)):
+    """Set a new password with the token from the reset link; signs out every session"""
+    user = await redeem_action_token(PASSWORD_RESET, data.token, db)
+    if user is None or not await reset_password(user, data.new_password, db):
+        raise _invalid_link()
+    return preencoded(PASSWORD_RESET_DONE_BODY)
@@ -0,0 +1,56 @@
+# backend/api/intake_routes.py
+"""
+Contact and beta signup routes
+
+Each submission is one outbox INSERT; Sheets and mail happen in
+backend.utils.intake. A repeated submission (same Idempotency-Key header, or
+with no header the same content) is stored once and gets the same reply.
+"""
+
+import hashlib
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Header, status
+
+from backend.database.connection import get_db
+from backend.models.schemas import BetaSignup, Contact
+from backend.models.user import MessageResponse
+from backend.utils.intake import BETA, CONTACT, enqueue
+from backend.utils.ratelimit import intake_ip_limit
+from backend.utils.responses import preencoded
+
+router = APIRouter(tags=["Intake"])
+
+RECEIVED_BODY = b'{"message":"Thanks! We received your submission","success":true}'
+MAX_IDEMPOTENCY_KEY_LENGTH = 200
+
+
+def idempotency_key(kind: str, payload: dict, header: Optional[str]) -> str:
+    if header:
+        source = f"{kind}\x1fkey\x1f{header[:MAX_IDEMPOTENCY_KEY_LENGTH]}".encode()
+    else:
+        source = f"{kind}\x1fbody\x1f".encode() + orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(source).hexdigest()
+
+
+async def _submit(kind: str, payload: dict, header: Optional[str], db):
+    payload["email"] = payload["email"].lower()
+    await enqueue(kind, payload, idempotency_key(kind, payload, header), db)
+    return preencoded(RECEIVED_BODY, status.HTTP_202_ACCEPTED)
+
+
+@router.post("/contact", response_model=MessageResponse, status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(intake_ip_limit)])
+async def contact(submission: Contact, db = Depends(get_db),
+                  idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Accept a contact form message"""
+    return await _submit(CONTACT, submission.model_dump(), idempotency_key_header, db)
+
+
+@router.post("/beta", response_model=MessageResponse, status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(intake_ip_limit)])
+async def beta(signup: BetaSignup, db = Depends(get_db),
+               idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Accept a beta program signup"""
+    return await _submit(BETA, signup.model_dump(), idempotency_key_header, db)
@@ -1,5 +1,10 @@
-import sqlite3
+import os
 
-def get_connection():
-    conn = sqlite3.connect("chiefai.db")
-    return conn
+# "postgres" (asyncpg, DATABASE_URL) or "sqlite" (single node, file at SQLITE_PATH)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres").lower()
+
+# Apply pending Postgres migrations at startup; backend.serve does it once in the master (see backend.database.migrations)
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "chiefai.db")
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
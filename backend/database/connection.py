@@ -1,35 +1,119 @@
+import asyncio
 import os
+import time
 from contextlib import asynccontextmanager
-import asyncpg
+from typing import Iterable, Optional, Tuple
+
+from backend.database.storage import get_storage
+from backend.utils.metrics import record_pool
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Connection budget for this whole instance, split across its gunicorn workers
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "2"))
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+
 pool = None
+replica_pool = None
+
+
+def pool_size() -> Tuple[int, int]:
+    """(min_size, max_size) per worker; DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE override the derived values"""
+    per_worker = max(2, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY))
+    max_size = int(os.getenv("DB_POOL_MAX_SIZE", str(per_worker)))
+    min_size = int(os.getenv("DB_POOL_MIN_SIZE", str(max(1, max_size // 4))))
+    return min(min_size, max_size), max_size
+
+
+async def _create_pool(url: str):
+    # Imported here so workers on the SQLite backend never load asyncpg
+    import asyncpg
+    min_size, max_size = pool_size()
+    return await asyncpg.create_pool(
+        url,
+        min_size=min_size,
+        max_size=max_size,
+        command_timeout=60
+    )
 
 
 async def init_db():
-    global pool
+    global pool, replica_pool
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable is not set")
-    
-    pool = await asyncpg.create_pool(
-        DATABASE_URL,
-        min_size=1,
-        max_size=10,
-        command_timeout=60
-    )
-    print("✅ Database connection pool created")
+
+    pool = await _create_pool(DATABASE_URL)
+    print(f"✅ Database connection pool created (min={pool.get_min_size()}, max={pool.get_max_size()})")
+
+    if DATABASE_REPLICA_URL:
+        import asyncpg
+        try:
+            replica_pool = await _create_pool(DATABASE_REPLICA_URL)
+            print("✅ Read replica connection pool created")
+        except (OSError, asyncpg.PostgresError) as exc:
+            replica_pool = None
+            print(f"⚠️ Read replica unavailable, reads will use the primary: {exc}")
+
+
+async def warm_up(statements: Iterable[Tuple[str, tuple]]):
+    """Check out every min_size connection at once and run the warmup statements on each,
+    so their plans are cached before the first real request"""
+    statements = list(statements)
+    for target in (pool, replica_pool):
+        if target is None:
+            continue
+        connections = await asyncio.gather(*(target.acquire() for _ in range(target.get_min_size())))
+        try:
+            for conn in connections:
+                for sql, args in statements:
+                    await conn.fetch(sql, *args)
+        finally:
+            for conn in connections:
+                await target.release(conn)
 
 
 async def close_db():
-    global pool
+    global pool, replica_pool
+    if replica_pool:
+        await replica_pool.close()
+        replica_pool = None
     if pool:
         await pool.close()
         print("✅ Database connection pool closed")
 
 
-async def get_db():
-    if not pool:
+@asynccontextmanager
+async def acquire(readonly: bool = False):
+    target = replica_pool if readonly and replica_pool else pool
+    if not target:
         raise RuntimeError("Database pool not initialized")
-    async with pool.acquire() as connection:
+    start = time.perf_counter()
+    async with target.acquire() as connection:
+        record_pool(target, time.perf_counter() - start)
+        yield connection
+
+
+async def pool_health(target) -> Optional[dict]:
+    """Round-trip time and saturation for one pool; None if the pool does not exist"""
+    if target is None:
+        return None
+    start = time.perf_counter()
+    async with target.acquire(timeout=READY_TIMEOUT_SECONDS) as connection:
+        await connection.fetchval("SELECT 1", timeout=READY_TIMEOUT_SECONDS)
+    round_trip = time.perf_counter() - start
+    size, idle, max_size = target.get_size(), target.get_idle_size(), target.get_max_size()
+    return {
+        "round_trip_ms": round(round_trip * 1000, 2),
+        "size": size,
+        "idle": idle,
+        "max_size": max_size,
+        "saturation": round((size - idle) / max_size, 3),
+    }
+
+
+async def get_db():
+    async with get_storage().acquire() as connection:
         yield connection
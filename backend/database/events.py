@@ -0,0 +1,95 @@
+# backend/database/events.py
+"""
+Cross-worker notifications over Postgres LISTEN/NOTIFY
+
+With the Postgres backend each worker holds one pooled connection that
+LISTENs on every subscribed channel. If that connection drops, handlers
+receive "*" (everything may be stale) and the listener reconnects in the
+background. Other backends only deliver notifications within the process.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from backend.database import connection
+from backend.database.storage import get_storage
+
+RECONNECT_DELAY_SECONDS = 1.0
+
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+_listener = None
+_reconnect_task: Optional[asyncio.Task] = None
+_stopping = False
+
+
+def subscribe(channel: str, handler: Callable[[str], None]):
+    """Call ``handler(payload)`` for every NOTIFY on ``channel``"""
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def deliver(channel: str, payload: str):
+    """Run this process's handlers for ``channel`` directly; a failing handler does not stop the others"""
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(payload)
+        except Exception as exc:
+            print(f"⚠️ {channel} handler failed on {payload!r}: {exc}")
+
+
+def _dispatch(conn, pid, channel, payload):
+    deliver(channel, payload)
+
+
+def _on_termination(conn):
+    global _listener, _reconnect_task
+    _listener = None
+    for channel in _handlers:
+        deliver(channel, "*")
+    if not _stopping:
+        _reconnect_task = asyncio.get_running_loop().create_task(_reconnect())
+
+
+async def _reconnect():
+    while not _stopping and _listener is None:
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+        try:
+            await start_listener()
+        except Exception as exc:
+            print(f"⚠️ Notification listener reconnect failed: {exc}")
+
+
+async def start_listener():
+    """Acquire a pooled connection and LISTEN on all subscribed channels"""
+    global _listener, _stopping
+    _stopping = False
+    if _listener is not None or connection.pool is None:
+        return
+    conn = await connection.pool.acquire()
+    try:
+        for channel in _handlers:
+            await conn.add_listener(channel, _dispatch)
+    except Exception:
+        await connection.pool.release(conn)
+        raise
+    conn.add_termination_listener(_on_termination)
+    _listener = conn
+
+
+async def stop_listener():
+    """Stop listening and hand the connection back to the pool"""
+    global _listener, _stopping
+    _stopping = True
+    if _reconnect_task is not None:
+        _reconnect_task.cancel()
+    conn, _listener = _listener, None
+    if conn is None:
+        return
+    conn.remove_termination_listener(_on_termination)
+    for channel in _handlers:
+        await conn.remove_listener(channel, _dispatch)
+    await connection.pool.release(conn)
+
+
+async def notify(db, channel: str, payload: str):
+    """Publish ``payload`` on ``channel`` to every listening worker"""
+    await get_storage().notify(db, channel, payload)
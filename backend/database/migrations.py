@@ -0,0 +1,244 @@
+# backend/database/migrations.py
+"""
+Postgres schema migrations
+
+    python -m backend.database.migrations          # apply pending migrations
+    python -m backend.database.migrations status   # list applied / pending
+
+Also applied at startup unless DB_MIGRATE_ON_STARTUP=false: once by the
+gunicorn master (backend.serve) before any worker forks, or by the single
+process under plain uvicorn. A session advisory lock serializes concurrent
+runners. It is polled with pg_try_advisory_lock rather than waited on,
+because CREATE INDEX CONCURRENTLY waits for every open transaction, and a
+session blocked in pg_advisory_lock is one.
+
+Transactional migrations run in one transaction. The others (CREATE INDEX
+CONCURRENTLY, which cannot run inside one) run statement by statement and
+must be written to be re-runnable. A concurrent build that fails leaves an
+INVALID index that IF NOT EXISTS would skip. Such indexes are dropped and
+rebuilt before a migration is recorded, and on every run for migrations
+already recorded.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from typing import List, NamedTuple
+
+MIGRATIONS_LOCK = "hashtext('schema_migrations')"
+LOCK_POLL_SECONDS = 0.5
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: List[str]
+    transactional: bool = True
+
+
+MIGRATIONS = [
+    Migration(1, "users and refresh_tokens", ["""
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            company_name TEXT,
+            role TEXT NOT NULL DEFAULT 'user',
+            is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+            is_active BOOLEAN NOT NULL DEFAULT TRUE,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_login TIMESTAMPTZ,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS refresh_tokens (
+            user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            token_hash BYTEA NOT NULL,
+            expires_at TIMESTAMPTZ NOT NULL,
+            is_revoked BOOLEAN NOT NULL DEFAULT FALSE,
+            revoked_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """]),
+    # Databases created before tokens were stored by digest still have the plaintext column
+    Migration(2, "refresh token digests", ["""
+        ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS token_hash BYTEA;
+        ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS revoked_at TIMESTAMPTZ;
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'refresh_tokens' AND column_name = 'token') THEN
+                UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))
+                WHERE token_hash IS NULL;
+                ALTER TABLE refresh_tokens DROP COLUMN token;
+            END IF;
+        END $$;
+        ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL;
+    """]),
+    Migration(3, "lookup indexes", [
+        # Email lookups compare lower(email) = lower($1)
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_email_lower_key ON users (lower(email))",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS refresh_tokens_token_hash_key ON refresh_tokens (token_hash)",
+        # Live tokens per user, for reuse revocation; expiry can't be in the predicate (NOW() is not immutable)
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS refresh_tokens_live_user_idx"
+        " ON refresh_tokens (user_id, expires_at) WHERE NOT is_revoked",
+        # The purge's two arms: expired tokens, and revoked ones past retention
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS refresh_tokens_expires_at_idx ON refresh_tokens (expires_at)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS refresh_tokens_revoked_at_idx"
+        " ON refresh_tokens (revoked_at) WHERE is_revoked",
+    ], transactional=False),
+    Migration(4, "users.updated_at trigger", ["""
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = NOW();
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS users_set_updated_at ON users;
+        CREATE TRIGGER users_set_updated_at BEFORE UPDATE ON users
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+    """]),
+    # Shared rate-limit buckets (RATE_LIMIT_BACKEND=postgres); unlogged, they are safe to lose
+    Migration(5, "rate limit buckets", ["""
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            allowed BOOLEAN NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL
+        );
+    """]),
+    # Tokens carry the generation they were minted under; bumping it revokes them all
+    Migration(6, "users.session_generation", ["""
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS session_generation INTEGER NOT NULL DEFAULT 0;
+    """]),
+    # Contact/beta submissions waiting to be fanned out to Sheets and mail (backend.utils.intake)
+    Migration(7, "intake outbox", ["""
+        CREATE TABLE IF NOT EXISTS intake_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            kind TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            done TEXT[] NOT NULL DEFAULT '{}',
+            last_error TEXT,
+            available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            processed_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS intake_outbox_due_idx ON intake_outbox (available_at) WHERE status = 'pending';
+        CREATE INDEX IF NOT EXISTS intake_outbox_sent_idx ON intake_outbox (processed_at) WHERE status = 'sent';
+    """]),
+]
+
+
+INVALID_INDEXES = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid AND c.relname = ANY($1::text[])
+"""
+
+CONCURRENT_INDEX = re.compile(r"INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def concurrent_indexes(migration: Migration) -> List[str]:
+    """Indexes a migration builds with CREATE INDEX CONCURRENTLY"""
+    return [name for statement in migration.statements for name in CONCURRENT_INDEX.findall(statement)]
+
+
+async def invalid_indexes(db, names: List[str]) -> List[str]:
+    if not names:
+        return []
+    return [row["relname"] for row in await db.fetch(INVALID_INDEXES, names)]
+
+
+async def _build_concurrently(db, migration: Migration):
+    """Run a non-transactional migration, rebuilding any index a failed earlier attempt left invalid"""
+    names = concurrent_indexes(migration)
+    for name in await invalid_indexes(db, names):
+        print(f"⚠️ Rebuilding invalid index {name}")
+        await db.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+    for statement in migration.statements:
+        await db.execute(statement)
+    invalid = await invalid_indexes(db, names)
+    if invalid:
+        raise RuntimeError(f"Migration {migration.version} left invalid indexes: {', '.join(invalid)}")
+
+
+async def _lock(db):
+    # Never block inside a statement: a concurrent index build in the holder would wait on us
+    while not await db.fetchval(f"SELECT pg_try_advisory_lock({MIGRATIONS_LOCK})"):
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+
+
+async def applied_versions(db) -> List[int]:
+    await db.execute(CREATE_MIGRATIONS_TABLE)
+    return [row["version"] for row in await db.fetch("SELECT version FROM schema_migrations ORDER BY version")]
+
+
+async def migrate(db) -> List[int]:
+    """Apply every pending migration on this connection; returns the versions applied"""
+    await _lock(db)
+    try:
+        done = set(await applied_versions(db))
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                if not migration.transactional and await invalid_indexes(db, concurrent_indexes(migration)):
+                    await _build_concurrently(db, migration)
+                continue
+            if migration.transactional:
+                async with db.transaction():
+                    for statement in migration.statements:
+                        await db.execute(statement)
+                    await db.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                        migration.version, migration.name
+                    )
+            else:
+                await _build_concurrently(db, migration)
+                await db.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    migration.version, migration.name
+                )
+            print(f"✅ Applied migration {migration.version}: {migration.name}")
+            applied.append(migration.version)
+        return applied
+    finally:
+        await db.execute(f"SELECT pg_advisory_unlock({MIGRATIONS_LOCK})")
+
+
+async def run(command: str = "up"):
+    """Apply (or list) migrations over a dedicated connection to DATABASE_URL"""
+    import asyncpg
+
+    # Not backend.database.connection: the gunicorn master calls this and must not import the metrics
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL environment variable is not set")
+    db = await asyncpg.connect(database_url)
+    try:
+        if command == "status":
+            done = set(await applied_versions(db))
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.name}")
+        else:
+            if not await migrate(db):
+                print("✅ Schema is up to date")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "up"
+    if command not in ("up", "status"):
+        raise SystemExit("usage: python -m backend.database.migrations [up|status]")
+    asyncio.run(run(command))
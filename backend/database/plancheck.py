@@ -0,0 +1,83 @@
+# backend/database/plancheck.py
+"""
+Query plan checker for the Postgres backend
+
+    DATABASE_URL=... python -m backend.database.plancheck
+
+EXPLAINs every statement the auth hot paths issue (backend.database.postgres)
+against a migrated database, with enable_seqscan off so the planner only
+falls back to a sequential scan when no index can serve the query. Exits 1
+if any plan scans users, refresh_tokens or intake_outbox sequentially. Nothing is executed.
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from backend.database import postgres
+
+GUARDED_TABLES = {"users", "refresh_tokens", "intake_outbox"}
+
+# (name, statement, sample arguments); EXPORT_USERS reads the whole table on purpose and is left out
+CHECKS = [
+    ("fetch_user_by_email", postgres.SELECT_USER_BY_EMAIL, ("someone@example.com",)),
+    ("fetch_user_by_id", postgres.SELECT_USER_BY_ID, ("user-id",)),
+    ("update_password_hash", postgres.UPDATE_PASSWORD_HASH, ("user-id", "hash")),
+    ("replace_password_hash", postgres.REPLACE_PASSWORD_HASH, ("user-id", "old", "new")),
+    ("mark_email_verified", postgres.MARK_EMAIL_VERIFIED, ("user-id",)),
+    ("bulk_update_last_login", postgres.BULK_UPDATE_LAST_LOGIN, (["user-id"], [datetime.now(timezone.utc)])),
+    ("fetch_refresh_token_owner", postgres.SELECT_VALID_REFRESH_TOKEN, (b"digest",)),
+    ("revoke_refresh_token", postgres.REVOKE_REFRESH_TOKEN, (b"digest",)),
+    ("rotate_refresh_token", postgres.ROTATE_REFRESH_TOKEN, (b"old", "user-id", b"new", timedelta(days=7))),
+    ("bump_session_generation", postgres.BUMP_SESSION_GENERATION, ("user-id",)),
+    ("purge_refresh_tokens", postgres.PURGE_REFRESH_TOKENS, (timedelta(hours=24), 1000)),
+    ("claim_intake", postgres.CLAIM_INTAKE, (50, timedelta(minutes=2))),
+    ("finish_intake", postgres.FINISH_INTAKE, (1, "sent", [], None, timedelta(0))),
+    ("purge_intake", postgres.PURGE_INTAKE, (timedelta(days=30), 1000)),
+]
+
+
+def seq_scans(plan: dict) -> List[str]:
+    """Guarded relations scanned sequentially anywhere in a plan tree"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in GUARDED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def check(db) -> bool:
+    ok = True
+    async with db.transaction():
+        await db.execute("SET LOCAL enable_seqscan = off")
+        for name, sql, args in CHECKS:
+            raw = await db.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            scanned = seq_scans(plan)
+            if scanned:
+                ok = False
+                print(f"❌ {name}: sequential scan on {', '.join(sorted(set(scanned)))}")
+            else:
+                print(f"✅ {name}")
+    return ok
+
+
+async def _main() -> bool:
+    import asyncpg
+
+    from backend.database.connection import DATABASE_URL
+
+    if not DATABASE_URL:
+        raise SystemExit("DATABASE_URL environment variable is not set")
+    db = await asyncpg.connect(DATABASE_URL)
+    try:
+        return await check(db)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(_main()) else 1)
@@ -0,0 +1,330 @@
+# backend/database/postgres.py
+"""
+asyncpg/Postgres storage backend
+
+Every method issues a single, constant SQL string so asyncpg's
+per-connection statement cache keeps it prepared after the first call.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+import asyncpg
+import orjson
+
+from backend.database import config, connection, migrations
+from backend.database.storage import EXPORT_COLUMNS, IntakeItem, IntakeResult, StorageBackend
+from backend.models.user import UserInDB
+from backend.utils.metrics import timed_query
+
+USER_COLUMNS = """
+    id, name, email, password_hash, company_name, role,
+    is_verified, is_active, created_at, last_login, updated_at, session_generation
+"""
+
+# Matches the unique index on lower(email), which also makes lookups case-insensitive
+SELECT_USER_BY_EMAIL = f"SELECT {USER_COLUMNS} FROM users WHERE lower(email) = lower($1)"
+
+SELECT_USER_BY_ID = f"SELECT {USER_COLUMNS} FROM users WHERE id = $1"
+
+INSERT_USER = f"""
+    INSERT INTO users (id, name, email, password_hash, company_name, role, is_verified, is_active)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    RETURNING {USER_COLUMNS}
+"""
+
+UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = $2 WHERE id = $1"
+
+REPLACE_PASSWORD_HASH = "UPDATE users SET password_hash = $3 WHERE id = $1 AND password_hash = $2"
+
+MARK_EMAIL_VERIFIED = "UPDATE users SET is_verified = TRUE WHERE id = $1 AND NOT is_verified"
+
+IMPORT_COLUMNS = ["id", "name", "email", "password_hash", "company_name"]
+
+# Staging table for COPY; a duplicate email must not abort the whole load
+CREATE_IMPORT_TABLE = "CREATE TEMP TABLE users_import (LIKE users INCLUDING DEFAULTS) ON COMMIT DROP"
+
+IMPORT_USERS = """
+    INSERT INTO users (id, name, email, password_hash, company_name, role, is_verified, is_active)
+    SELECT id, name, email, password_hash, company_name, 'user', FALSE, TRUE FROM users_import
+    ON CONFLICT DO NOTHING
+    RETURNING email
+"""
+
+EXPORT_USERS = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM users"
+
+# GREATEST keeps the newest timestamp when several workers flush the same user
+BULK_UPDATE_LAST_LOGIN = """
+    UPDATE users AS u SET last_login = GREATEST(u.last_login, v.last_login)
+    FROM unnest($1::text[], $2::timestamptz[]) AS v(id, last_login)
+    WHERE u.id = v.id
+"""
+
+# Refresh tokens are keyed on the SHA-256 digest of the JWT, never the token itself
+INSERT_REFRESH_TOKEN = """
+    INSERT INTO refresh_tokens (user_id, token_hash, expires_at)
+    VALUES ($1, $2, NOW() + $3::interval)
+"""
+
+SELECT_VALID_REFRESH_TOKEN = """
+    SELECT user_id FROM refresh_tokens
+    WHERE token_hash = $1 AND NOT is_revoked AND expires_at > NOW()
+"""
+
+REVOKE_REFRESH_TOKEN = """
+    UPDATE refresh_tokens SET is_revoked = TRUE, revoked_at = NOW()
+    WHERE token_hash = $1 AND NOT is_revoked
+"""
+
+# One round-trip rotation: revoke the presented token and issue its successor
+# if it is live and its owner is active. Presenting an already revoked token is
+# treated as reuse of a stolen token and revokes every live token of the user.
+# All CTEs read the same snapshot, so "presented" sees the pre-rotation state.
+ROTATE_REFRESH_TOKEN = """
+    WITH presented AS (
+        SELECT is_revoked FROM refresh_tokens
+        WHERE token_hash = $1 AND user_id = $2
+    ),
+    rotated AS (
+        UPDATE refresh_tokens rt
+        SET is_revoked = TRUE, revoked_at = NOW()
+        FROM users u
+        WHERE rt.token_hash = $1 AND rt.user_id = $2
+          AND NOT rt.is_revoked AND rt.expires_at > NOW()
+          AND u.id = rt.user_id AND u.is_active
+        RETURNING rt.user_id, u.email
+    ),
+    issued AS (
+        INSERT INTO refresh_tokens (user_id, token_hash, expires_at)
+        SELECT user_id, $3, NOW() + $4::interval FROM rotated
+    ),
+    family_revoked AS (
+        UPDATE refresh_tokens
+        SET is_revoked = TRUE, revoked_at = NOW()
+        WHERE user_id = $2 AND NOT is_revoked
+          AND EXISTS (SELECT 1 FROM presented WHERE is_revoked)
+    )
+    SELECT (SELECT email FROM rotated) AS email,
+           EXISTS (SELECT 1 FROM presented WHERE is_revoked) AS reused
+"""
+
+BUMP_SESSION_GENERATION = """
+    WITH bumped AS (
+        UPDATE users SET session_generation = session_generation + 1
+        WHERE id = $1
+        RETURNING session_generation
+    ),
+    revoked AS (
+        UPDATE refresh_tokens SET is_revoked = TRUE, revoked_at = NOW()
+        WHERE user_id = $1 AND NOT is_revoked AND EXISTS (SELECT 1 FROM bumped)
+    )
+    SELECT session_generation FROM bumped
+"""
+
+PURGE_REFRESH_TOKENS = """
+    DELETE FROM refresh_tokens WHERE token_hash IN (
+        SELECT token_hash FROM refresh_tokens
+        WHERE expires_at < NOW() OR (is_revoked AND revoked_at < NOW() - $1::interval)
+        LIMIT $2
+    )
+"""
+
+INSERT_INTAKE = """
+    INSERT INTO intake_outbox (idempotency_key, kind, payload) VALUES ($1, $2, $3::jsonb)
+    ON CONFLICT (idempotency_key) DO NOTHING
+"""
+
+# SKIP LOCKED lets every worker claim concurrently without waiting on each other's rows;
+# pushing available_at out is the lease, so nothing stays locked while the effects run
+CLAIM_INTAKE = """
+    WITH due AS (
+        SELECT id FROM intake_outbox
+        WHERE status = 'pending' AND available_at <= NOW()
+        ORDER BY available_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE intake_outbox o
+    SET available_at = NOW() + $2::interval, attempts = o.attempts + 1
+    FROM due WHERE o.id = due.id
+    RETURNING o.id, o.kind, o.payload::text AS payload, o.attempts, o.done
+"""
+
+FINISH_INTAKE = """
+    UPDATE intake_outbox
+    SET status = $2, done = $3, last_error = $4,
+        available_at = NOW() + $5::interval,
+        processed_at = CASE WHEN $2 = 'pending' THEN NULL ELSE NOW() END
+    WHERE id = $1
+"""
+
+PURGE_INTAKE = """
+    DELETE FROM intake_outbox WHERE id IN (
+        SELECT id FROM intake_outbox
+        WHERE status = 'sent' AND processed_at < NOW() - $1::interval
+        LIMIT $2
+    )
+"""
+
+# Lets exactly one worker run a purge batch at a time
+PURGE_LOCK = "SELECT pg_try_advisory_xact_lock(hashtext('refresh_tokens_purge'))"
+
+# Hot read statements run once per warm connection at startup (matching nothing)
+# so asyncpg has them parsed, planned and cached before the first request
+WARMUP_STATEMENTS = [
+    (SELECT_USER_BY_ID, ("",)),
+    (SELECT_USER_BY_EMAIL, ("",)),
+]
+
+
+def _to_user(record: Optional[asyncpg.Record]) -> Optional[UserInDB]:
+    if record is None:
+        return None
+    return UserInDB(**dict(record))
+
+
+class PostgresBackend(StorageBackend):
+    name = "postgres"
+
+    @property
+    def has_replica(self) -> bool:
+        return connection.replica_pool is not None
+
+    async def startup(self):
+        await connection.init_db()
+        if config.DB_MIGRATE_ON_STARTUP:
+            async with connection.acquire() as db:
+                await migrations.migrate(db)
+        try:
+            await connection.warm_up(WARMUP_STATEMENTS)
+        except asyncpg.PostgresError as exc:
+            print(f"⚠️ Statement warmup skipped: {exc}")
+
+    async def shutdown(self):
+        await connection.close_db()
+
+    def acquire(self, readonly: bool = False):
+        return connection.acquire(readonly)
+
+    async def health(self) -> dict:
+        report = {"primary": await connection.pool_health(connection.pool)}
+        if connection.replica_pool is not None:
+            try:
+                report["replica"] = await connection.pool_health(connection.replica_pool)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as exc:
+                report["replica"] = {"error": str(exc)}
+        return report
+
+    async def notify(self, db: asyncpg.Connection, channel: str, payload: str):
+        await db.execute("SELECT pg_notify($1, $2)", channel, payload)
+
+    @timed_query
+    async def fetch_user_by_email(self, db: asyncpg.Connection, email: str) -> Optional[UserInDB]:
+        return _to_user(await db.fetchrow(SELECT_USER_BY_EMAIL, email))
+
+    @timed_query
+    async def fetch_user_by_id(self, db: asyncpg.Connection, user_id: str) -> Optional[UserInDB]:
+        return _to_user(await db.fetchrow(SELECT_USER_BY_ID, user_id))
+
+    @timed_query
+    async def insert_user(self, db: asyncpg.Connection, user_id: str, name: str, email: str,
+                          password_hash: str, company_name: Optional[str], role: str = "user") -> Optional[UserInDB]:
+        try:
+            async with db.transaction():
+                record = await db.fetchrow(
+                    INSERT_USER,
+                    user_id, name, email, password_hash, company_name, role, False, True
+                )
+        except asyncpg.UniqueViolationError:
+            return None
+        return _to_user(record)
+
+    @timed_query
+    async def bulk_insert_users(self, db: asyncpg.Connection,
+                                rows: List[Tuple[str, str, str, str, Optional[str]]]) -> List[str]:
+        async with db.transaction():
+            await db.execute(CREATE_IMPORT_TABLE)
+            await db.copy_records_to_table("users_import", records=rows, columns=IMPORT_COLUMNS)
+            inserted = {record["email"] for record in await db.fetch(IMPORT_USERS)}
+        return [row[2] for row in rows if row[2] not in inserted]
+
+    async def stream_users(self, db: asyncpg.Connection, batch_size: int) -> AsyncIterator[List[dict]]:
+        # Server-side cursors only live inside a transaction
+        async with db.transaction(readonly=True):
+            cursor = await db.cursor(EXPORT_USERS)
+            while True:
+                records = await cursor.fetch(batch_size)
+                if not records:
+                    break
+                yield [dict(record) for record in records]
+
+    @timed_query
+    async def update_password_hash(self, db: asyncpg.Connection, user_id: str, password_hash: str):
+        await db.execute(UPDATE_PASSWORD_HASH, user_id, password_hash)
+
+    @timed_query
+    async def replace_password_hash(self, db: asyncpg.Connection, user_id: str, old_hash: str, new_hash: str) -> bool:
+        return await db.execute(REPLACE_PASSWORD_HASH, user_id, old_hash, new_hash) == "UPDATE 1"
+
+    @timed_query
+    async def mark_email_verified(self, db: asyncpg.Connection, user_id: str):
+        await db.execute(MARK_EMAIL_VERIFIED, user_id)
+
+    @timed_query
+    async def bulk_update_last_login(self, db: asyncpg.Connection, user_ids: List[str], timestamps: List[datetime]):
+        await db.execute(BULK_UPDATE_LAST_LOGIN, user_ids, timestamps)
+
+    @timed_query
+    async def insert_refresh_token(self, db: asyncpg.Connection, user_id: str, token_hash: bytes, ttl: timedelta):
+        await db.execute(INSERT_REFRESH_TOKEN, user_id, token_hash, ttl)
+
+    @timed_query
+    async def fetch_refresh_token_owner(self, db: asyncpg.Connection, token_hash: bytes) -> Optional[str]:
+        return await db.fetchval(SELECT_VALID_REFRESH_TOKEN, token_hash)
+
+    @timed_query
+    async def revoke_refresh_token(self, db: asyncpg.Connection, token_hash: bytes):
+        await db.execute(REVOKE_REFRESH_TOKEN, token_hash)
+
+    @timed_query
+    async def rotate_refresh_token(self, db: asyncpg.Connection, user_id: str, old_hash: bytes,
+                                   new_hash: bytes, ttl: timedelta) -> Tuple[Optional[str], bool]:
+        record = await db.fetchrow(ROTATE_REFRESH_TOKEN, old_hash, user_id, new_hash, ttl)
+        return record["email"], record["reused"]
+
+    @timed_query
+    async def bump_session_generation(self, db: asyncpg.Connection, user_id: str) -> Optional[int]:
+        return await db.fetchval(BUMP_SESSION_GENERATION, user_id)
+
+    @timed_query
+    async def purge_refresh_tokens(self, db: asyncpg.Connection, revoked_retention: timedelta, batch_size: int) -> int:
+        async with db.transaction():
+            if not await db.fetchval(PURGE_LOCK):
+                return -1
+            status = await db.execute(PURGE_REFRESH_TOKENS, revoked_retention, batch_size)
+        return int(status.split()[-1])
+
+    @timed_query
+    async def enqueue_intake(self, db: asyncpg.Connection, idempotency_key: str, kind: str, payload: dict) -> bool:
+        status = await db.execute(INSERT_INTAKE, idempotency_key, kind, orjson.dumps(payload).decode())
+        return status == "INSERT 0 1"
+
+    @timed_query
+    async def claim_intake(self, db: asyncpg.Connection, batch_size: int, lease: timedelta) -> List[IntakeItem]:
+        rows = await db.fetch(CLAIM_INTAKE, batch_size, lease)
+        return [
+            IntakeItem(row["id"], row["kind"], orjson.loads(row["payload"]), row["attempts"], list(row["done"]))
+            for row in rows
+        ]
+
+    @timed_query
+    async def finish_intake(self, db: asyncpg.Connection, results: List[IntakeResult]):
+        await db.executemany(FINISH_INTAKE, [
+            (r.id, r.status, r.done, r.error, r.retry_in) for r in results
+        ])
+
+    @timed_query
+    async def purge_intake(self, db: asyncpg.Connection, retention: timedelta, batch_size: int) -> int:
+        status = await db.execute(PURGE_INTAKE, retention, batch_size)
+        return int(status.split()[-1])
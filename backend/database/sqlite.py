@@ -0,0 +1,437 @@
+# backend/database/sqlite.py
+"""
+Embedded SQLite storage backend
+
+For single-node deployments, tests and benchmarks. The database runs in WAL
+mode so readers never block the writer, and a small pool of aiosqlite
+connections keeps each connection's statement cache warm. Change
+notifications stay inside this process; with several workers on one file,
+caches fall back to their TTL.
+"""
+
+import asyncio
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiosqlite
+import orjson
+
+from backend.database import events
+from backend.database.storage import EXPORT_COLUMNS, IntakeItem, IntakeResult, StorageBackend
+from backend.models.user import UserInDB
+from backend.utils.metrics import timed_query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    company_name TEXT,
+    role TEXT NOT NULL DEFAULT 'user',
+    is_verified INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    last_login TEXT,
+    updated_at TEXT NOT NULL,
+    session_generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_lower_key ON users (lower(email));
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    token_hash BLOB PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    expires_at REAL NOT NULL,
+    is_revoked INTEGER NOT NULL DEFAULT 0,
+    revoked_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refresh_tokens_user_id_idx ON refresh_tokens (user_id);
+CREATE INDEX IF NOT EXISTS refresh_tokens_expires_at_idx ON refresh_tokens (expires_at);
+
+CREATE TABLE IF NOT EXISTS intake_outbox (
+    id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    done TEXT NOT NULL DEFAULT '[]',
+    last_error TEXT,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS intake_outbox_due_idx ON intake_outbox (available_at) WHERE status = 'pending';
+"""
+
+USER_COLUMNS = """
+    id, name, email, password_hash, company_name, role,
+    is_verified, is_active, created_at, last_login, updated_at, session_generation
+"""
+
+# Columns added after the first release, for database files created before them
+ADDED_USER_COLUMNS = {
+    "session_generation": "ALTER TABLE users ADD COLUMN session_generation INTEGER NOT NULL DEFAULT 0",
+}
+
+SELECT_USER_BY_EMAIL = f"SELECT {USER_COLUMNS} FROM users WHERE lower(email) = lower(?)"
+
+SELECT_USER_BY_ID = f"SELECT {USER_COLUMNS} FROM users WHERE id = ?"
+
+INSERT_USER = f"""
+    INSERT INTO users (id, name, email, password_hash, company_name, role,
+                       is_verified, is_active, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, 0, 1, ?, ?)
+    RETURNING {USER_COLUMNS}
+"""
+
+UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ?"
+
+REPLACE_PASSWORD_HASH = "UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ? AND password_hash = ?"
+
+MARK_EMAIL_VERIFIED = "UPDATE users SET is_verified = 1, updated_at = ? WHERE id = ? AND NOT is_verified"
+
+IMPORT_USER = """
+    INSERT INTO users (id, name, email, password_hash, company_name, role,
+                       is_verified, is_active, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, 'user', 0, 1, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+EXPORT_USERS = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM users"
+
+UPDATE_LAST_LOGIN = """
+    UPDATE users SET last_login = MAX(COALESCE(last_login, ''), ?), updated_at = ?
+    WHERE id = ?
+"""
+
+INSERT_REFRESH_TOKEN = "INSERT INTO refresh_tokens (token_hash, user_id, expires_at) VALUES (?, ?, ?)"
+
+SELECT_VALID_REFRESH_TOKEN = """
+    SELECT user_id FROM refresh_tokens
+    WHERE token_hash = ? AND NOT is_revoked AND expires_at > ?
+"""
+
+SELECT_REFRESH_TOKEN = """
+    SELECT rt.is_revoked, rt.expires_at, u.email, u.is_active
+    FROM refresh_tokens rt JOIN users u ON u.id = rt.user_id
+    WHERE rt.token_hash = ? AND rt.user_id = ?
+"""
+
+REVOKE_REFRESH_TOKEN = """
+    UPDATE refresh_tokens SET is_revoked = 1, revoked_at = ?
+    WHERE token_hash = ? AND NOT is_revoked
+"""
+
+REVOKE_USER_REFRESH_TOKENS = """
+    UPDATE refresh_tokens SET is_revoked = 1, revoked_at = ?
+    WHERE user_id = ? AND NOT is_revoked
+"""
+
+BUMP_SESSION_GENERATION = """
+    UPDATE users SET session_generation = session_generation + 1, updated_at = ?
+    WHERE id = ?
+    RETURNING session_generation
+"""
+
+PURGE_REFRESH_TOKENS = """
+    DELETE FROM refresh_tokens WHERE token_hash IN (
+        SELECT token_hash FROM refresh_tokens
+        WHERE expires_at < ? OR (is_revoked AND revoked_at < ?)
+        LIMIT ?
+    )
+"""
+
+INSERT_INTAKE = """
+    INSERT INTO intake_outbox (idempotency_key, kind, payload, available_at, created_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (idempotency_key) DO NOTHING
+"""
+
+SELECT_DUE_INTAKE = """
+    SELECT id, kind, payload, attempts, done FROM intake_outbox
+    WHERE status = 'pending' AND available_at <= ?
+    ORDER BY available_at
+    LIMIT ?
+"""
+
+LEASE_INTAKE = "UPDATE intake_outbox SET available_at = ?, attempts = attempts + 1 WHERE id = ?"
+
+FINISH_INTAKE = """
+    UPDATE intake_outbox
+    SET status = ?, done = ?, last_error = ?, available_at = ?,
+        processed_at = CASE WHEN ? = 'pending' THEN NULL ELSE ? END
+    WHERE id = ?
+"""
+
+PURGE_INTAKE = """
+    DELETE FROM intake_outbox WHERE id IN (
+        SELECT id FROM intake_outbox WHERE status = 'sent' AND processed_at < ? LIMIT ?
+    )
+"""
+
+
+def _iso_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _to_user(row: Optional[aiosqlite.Row]) -> Optional[UserInDB]:
+    if row is None:
+        return None
+    return UserInDB(**dict(row))
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self._pool: Optional[asyncio.Queue] = None
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # isolation_level=None: autocommit, with explicit BEGIN IMMEDIATE for multi-statement writes
+        conn = await aiosqlite.connect(self.path, isolation_level=None, cached_statements=256)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA journal_mode = WAL")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+        await conn.execute("PRAGMA foreign_keys = ON")
+        await conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    async def startup(self):
+        if self._pool is not None:
+            return
+        first = await self._connect()
+        await first.executescript(SCHEMA)
+        async with first.execute("PRAGMA table_info(users)") as cursor:
+            existing = {row["name"] for row in await cursor.fetchall()}
+        for column, statement in ADDED_USER_COLUMNS.items():
+            if column not in existing:
+                await first.execute(statement)
+        self._connections = [first] + [await self._connect() for _ in range(self.pool_size - 1)]
+        self._pool = asyncio.Queue()
+        for conn in self._connections:
+            self._pool.put_nowait(conn)
+        print(f"✅ SQLite storage ready at {self.path} ({self.pool_size} connections)")
+
+    async def shutdown(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False):
+        if self._pool is None:
+            raise RuntimeError("SQLite storage not initialized")
+        conn = await self._pool.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._pool.put_nowait(conn)
+
+    async def health(self) -> dict:
+        start = time.perf_counter()
+        async with self.acquire() as db:
+            await self._fetchone(db, "SELECT 1", ())
+        round_trip = time.perf_counter() - start
+        idle = self._pool.qsize()
+        return {"primary": {
+            "round_trip_ms": round(round_trip * 1000, 2),
+            "size": self.pool_size,
+            "idle": idle,
+            "max_size": self.pool_size,
+            "saturation": round((self.pool_size - idle) / self.pool_size, 3),
+        }}
+
+    async def notify(self, db, channel: str, payload: str):
+        events.deliver(channel, payload)
+
+    async def _fetchone(self, db: aiosqlite.Connection, sql: str, params: tuple):
+        async with db.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    @timed_query
+    async def fetch_user_by_email(self, db: aiosqlite.Connection, email: str) -> Optional[UserInDB]:
+        return _to_user(await self._fetchone(db, SELECT_USER_BY_EMAIL, (email,)))
+
+    @timed_query
+    async def fetch_user_by_id(self, db: aiosqlite.Connection, user_id: str) -> Optional[UserInDB]:
+        return _to_user(await self._fetchone(db, SELECT_USER_BY_ID, (user_id,)))
+
+    @timed_query
+    async def insert_user(self, db: aiosqlite.Connection, user_id: str, name: str, email: str,
+                          password_hash: str, company_name: Optional[str], role: str = "user") -> Optional[UserInDB]:
+        now = _iso_now()
+        try:
+            row = await self._fetchone(
+                db, INSERT_USER, (user_id, name, email, password_hash, company_name, role, now, now)
+            )
+        except sqlite3.IntegrityError:
+            return None
+        return _to_user(row)
+
+    @timed_query
+    async def bulk_insert_users(self, db: aiosqlite.Connection,
+                                rows: List[Tuple[str, str, str, str, Optional[str]]]) -> List[str]:
+        now = _iso_now()
+        taken = []
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                cursor = await db.execute(IMPORT_USER, (*row, now, now))
+                if cursor.rowcount == 0:
+                    taken.append(row[2])
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        return taken
+
+    async def stream_users(self, db: aiosqlite.Connection, batch_size: int) -> AsyncIterator[List[dict]]:
+        async with db.execute(EXPORT_USERS) as cursor:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [
+                    {**dict(row), "is_verified": bool(row["is_verified"]), "is_active": bool(row["is_active"])}
+                    for row in rows
+                ]
+
+    @timed_query
+    async def update_password_hash(self, db: aiosqlite.Connection, user_id: str, password_hash: str):
+        await db.execute(UPDATE_PASSWORD_HASH, (password_hash, _iso_now(), user_id))
+
+    @timed_query
+    async def replace_password_hash(self, db: aiosqlite.Connection, user_id: str, old_hash: str, new_hash: str) -> bool:
+        cursor = await db.execute(REPLACE_PASSWORD_HASH, (new_hash, _iso_now(), user_id, old_hash))
+        return cursor.rowcount == 1
+
+    @timed_query
+    async def mark_email_verified(self, db: aiosqlite.Connection, user_id: str):
+        await db.execute(MARK_EMAIL_VERIFIED, (_iso_now(), user_id))
+
+    @timed_query
+    async def bulk_update_last_login(self, db: aiosqlite.Connection, user_ids: List[str], timestamps: List[datetime]):
+        now = _iso_now()
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await db.executemany(
+                UPDATE_LAST_LOGIN,
+                [(ts.astimezone(timezone.utc).isoformat(), now, user_id) for user_id, ts in zip(user_ids, timestamps)],
+            )
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+    @timed_query
+    async def insert_refresh_token(self, db: aiosqlite.Connection, user_id: str, token_hash: bytes, ttl: timedelta):
+        await db.execute(INSERT_REFRESH_TOKEN, (token_hash, user_id, time.time() + ttl.total_seconds()))
+
+    @timed_query
+    async def fetch_refresh_token_owner(self, db: aiosqlite.Connection, token_hash: bytes) -> Optional[str]:
+        row = await self._fetchone(db, SELECT_VALID_REFRESH_TOKEN, (token_hash, time.time()))
+        return row["user_id"] if row else None
+
+    @timed_query
+    async def revoke_refresh_token(self, db: aiosqlite.Connection, token_hash: bytes):
+        await db.execute(REVOKE_REFRESH_TOKEN, (time.time(), token_hash))
+
+    @timed_query
+    async def rotate_refresh_token(self, db: aiosqlite.Connection, user_id: str, old_hash: bytes,
+                                   new_hash: bytes, ttl: timedelta) -> Tuple[Optional[str], bool]:
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent rotations serialize
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            row = await self._fetchone(db, SELECT_REFRESH_TOKEN, (old_hash, user_id))
+            if row is None:
+                result = (None, False)
+            elif row["is_revoked"]:
+                await db.execute(REVOKE_USER_REFRESH_TOKENS, (now, user_id))
+                result = (None, True)
+            elif row["expires_at"] <= now or not row["is_active"]:
+                result = (None, False)
+            else:
+                await db.execute(REVOKE_REFRESH_TOKEN, (now, old_hash))
+                await db.execute(INSERT_REFRESH_TOKEN, (new_hash, user_id, now + ttl.total_seconds()))
+                result = (row["email"], False)
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        return result
+
+    @timed_query
+    async def bump_session_generation(self, db: aiosqlite.Connection, user_id: str) -> Optional[int]:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            row = await self._fetchone(db, BUMP_SESSION_GENERATION, (_iso_now(), user_id))
+            if row is not None:
+                await db.execute(REVOKE_USER_REFRESH_TOKENS, (time.time(), user_id))
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        return row["session_generation"] if row else None
+
+    @timed_query
+    async def purge_refresh_tokens(self, db: aiosqlite.Connection, revoked_retention: timedelta, batch_size: int) -> int:
+        now = time.time()
+        cursor = await db.execute(
+            PURGE_REFRESH_TOKENS, (now, now - revoked_retention.total_seconds(), batch_size)
+        )
+        return cursor.rowcount
+
+    @timed_query
+    async def enqueue_intake(self, db: aiosqlite.Connection, idempotency_key: str, kind: str, payload: dict) -> bool:
+        now = time.time()
+        cursor = await db.execute(INSERT_INTAKE, (idempotency_key, kind, orjson.dumps(payload).decode(), now, now))
+        return cursor.rowcount == 1
+
+    @timed_query
+    async def claim_intake(self, db: aiosqlite.Connection, batch_size: int, lease: timedelta) -> List[IntakeItem]:
+        # One writer at a time stands in for SKIP LOCKED
+        now = time.time()
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            async with db.execute(SELECT_DUE_INTAKE, (now, batch_size)) as cursor:
+                rows = await cursor.fetchall()
+            await db.executemany(LEASE_INTAKE, [(now + lease.total_seconds(), row["id"]) for row in rows])
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        return [
+            IntakeItem(row["id"], row["kind"], orjson.loads(row["payload"]), row["attempts"] + 1, orjson.loads(row["done"]))
+            for row in rows
+        ]
+
+    @timed_query
+    async def finish_intake(self, db: aiosqlite.Connection, results: List[IntakeResult]):
+        now = time.time()
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await db.executemany(FINISH_INTAKE, [
+                (r.status, orjson.dumps(r.done).decode(), r.error, now + r.retry_in.total_seconds(), r.status, now, r.id)
+                for r in results
+            ])
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+    @timed_query
+    async def purge_intake(self, db: aiosqlite.Connection, retention: timedelta, batch_size: int) -> int:
+        cursor = await db.execute(PURGE_INTAKE, (time.time() - retention.total_seconds(), batch_size))
+        return cursor.rowcount
@@ -0,0 +1,185 @@
+# backend/database/storage.py
+"""
+Storage backend interface for users, refresh tokens and the intake outbox
+
+The implementation is chosen by STORAGE_BACKEND (see backend.database.config).
+Callers acquire a connection with ``get_storage().acquire()`` (or the
+``get_db`` dependency) and pass it back into the data methods.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import AsyncContextManager, AsyncIterator, List, NamedTuple, Optional, Tuple
+
+from backend.database import config
+from backend.models.user import UserInDB
+
+# Data methods every backend implements; used by tooling that wraps them
+OPERATIONS = (
+    "fetch_user_by_email", "fetch_user_by_id", "insert_user", "update_password_hash",
+    "bulk_update_last_login", "insert_refresh_token", "fetch_refresh_token_owner",
+    "revoke_refresh_token", "rotate_refresh_token", "purge_refresh_tokens", "bulk_insert_users",
+    "bump_session_generation", "replace_password_hash", "mark_email_verified",
+    "enqueue_intake", "claim_intake", "finish_intake", "purge_intake",
+)
+
+# Columns written by user exports, in order (the UserResponse fields)
+EXPORT_COLUMNS = (
+    "id", "name", "email", "company_name", "role", "is_verified", "is_active", "created_at", "last_login",
+)
+
+
+class IntakeItem(NamedTuple):
+    """A claimed outbox row; ``done`` lists the effects already delivered on earlier attempts"""
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    done: List[str]
+
+
+class IntakeResult(NamedTuple):
+    """Outcome of one attempt: status is sent, pending (retry after retry_in) or dead"""
+    id: int
+    status: str
+    done: List[str]
+    error: Optional[str] = None
+    retry_in: timedelta = timedelta(0)
+
+
+class StorageBackend(ABC):
+    name: str
+    # True when acquire(readonly=True) may hand out a replica connection
+    has_replica = False
+
+    @abstractmethod
+    async def startup(self):
+        """Open connections and make sure the schema exists"""
+
+    @abstractmethod
+    async def shutdown(self):
+        """Close every connection"""
+
+    @abstractmethod
+    def acquire(self, readonly: bool = False) -> AsyncContextManager:
+        """Borrow a connection for the duration of an ``async with`` block;
+        ``readonly`` connections may come from a replica"""
+
+    @abstractmethod
+    async def health(self) -> dict:
+        """Round-trip and pool saturation figures for the readiness probe; raises if unreachable"""
+
+    @abstractmethod
+    async def notify(self, db, channel: str, payload: str):
+        """Publish a change notification to every worker that can see this store"""
+
+    @abstractmethod
+    async def fetch_user_by_email(self, db, email: str) -> Optional[UserInDB]:
+        """Fetch a user by email"""
+
+    @abstractmethod
+    async def fetch_user_by_id(self, db, user_id: str) -> Optional[UserInDB]:
+        """Fetch a user by ID"""
+
+    @abstractmethod
+    async def insert_user(self, db, user_id: str, name: str, email: str, password_hash: str,
+                          company_name: Optional[str], role: str = "user") -> Optional[UserInDB]:
+        """Insert a new user, returning None if the email is already taken"""
+
+    @abstractmethod
+    async def update_password_hash(self, db, user_id: str, password_hash: str):
+        """Replace a user's stored password hash"""
+
+    @abstractmethod
+    async def replace_password_hash(self, db, user_id: str, old_hash: str, new_hash: str) -> bool:
+        """Swap a user's password hash only if it is still ``old_hash``; False if it changed meanwhile"""
+
+    @abstractmethod
+    async def mark_email_verified(self, db, user_id: str):
+        """Set is_verified for a user"""
+
+    @abstractmethod
+    async def bulk_update_last_login(self, db, user_ids: List[str], timestamps: List[datetime]):
+        """Apply many last_login timestamps at once, never moving one backwards"""
+
+    @abstractmethod
+    async def insert_refresh_token(self, db, user_id: str, token_hash: bytes, ttl: timedelta):
+        """Store a refresh token digest that expires ``ttl`` from now"""
+
+    @abstractmethod
+    async def fetch_refresh_token_owner(self, db, token_hash: bytes) -> Optional[str]:
+        """Return the owning user_id of a live (unrevoked, unexpired) refresh token"""
+
+    @abstractmethod
+    async def revoke_refresh_token(self, db, token_hash: bytes):
+        """Mark a refresh token as revoked"""
+
+    @abstractmethod
+    async def rotate_refresh_token(self, db, user_id: str, old_hash: bytes, new_hash: bytes,
+                                   ttl: timedelta) -> Tuple[Optional[str], bool]:
+        """Atomically swap ``old_hash`` for ``new_hash``; returns (owner email or None, reuse detected).
+
+        Presenting an already revoked token revokes every live token of its owner.
+        """
+
+    @abstractmethod
+    async def bulk_insert_users(self, db, rows: List[Tuple[str, str, str, str, Optional[str]]]) -> List[str]:
+        """Insert (id, name, email, password_hash, company_name) rows in one transaction,
+        skipping taken emails; returns the emails that were skipped"""
+
+    @abstractmethod
+    def stream_users(self, db, batch_size: int) -> AsyncIterator[List[dict]]:
+        """Yield batches of EXPORT_COLUMNS dicts without loading the whole table"""
+
+    @abstractmethod
+    async def bump_session_generation(self, db, user_id: str) -> Optional[int]:
+        """Increment a user's session generation and revoke their refresh tokens;
+        returns the new generation, or None if there is no such user"""
+
+    @abstractmethod
+    async def purge_refresh_tokens(self, db, revoked_retention: timedelta, batch_size: int) -> int:
+        """Delete one batch of expired or long-revoked tokens; returns rows deleted, or -1 if another worker is purging"""
+
+    @abstractmethod
+    async def enqueue_intake(self, db, idempotency_key: str, kind: str, payload: dict) -> bool:
+        """Add a submission to the outbox; False if one with this key is already there"""
+
+    @abstractmethod
+    async def claim_intake(self, db, batch_size: int, lease: timedelta) -> List[IntakeItem]:
+        """Take up to ``batch_size`` due rows, hiding them from other claimers for ``lease``
+        (so a crashed worker's rows come back) and counting the attempt"""
+
+    @abstractmethod
+    async def finish_intake(self, db, results: List[IntakeResult]):
+        """Record the outcome of claimed rows"""
+
+    @abstractmethod
+    async def purge_intake(self, db, retention: timedelta, batch_size: int) -> int:
+        """Delete one batch of rows sent longer than ``retention`` ago; returns rows deleted"""
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def create_storage(name: str) -> StorageBackend:
+    if name == "postgres":
+        from backend.database.postgres import PostgresBackend
+        return PostgresBackend()
+    if name == "sqlite":
+        from backend.database.sqlite import SQLiteBackend
+        return SQLiteBackend(config.SQLITE_PATH, config.SQLITE_POOL_SIZE)
+    raise ValueError(f"Unknown STORAGE_BACKEND {name!r}; expected 'postgres' or 'sqlite'")
+
+
+def get_storage() -> StorageBackend:
+    """The configured backend, created on first use"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(config.STORAGE_BACKEND)
+    return _storage
+
+
+def set_storage(storage: StorageBackend):
+    """Swap the active backend (benchmarks and tooling)"""
+    global _storage
+    _storage = storage
@@ -1,6 +1,25 @@
-from pydantic import BaseModel, EmailStr
+from typing import Optional
+
+from pydantic import BaseModel, EmailStr, Field, validator
+
+def _non_blank(v: str) -> str:
+    v = v.strip()
+    if not v:
+        raise ValueError("must not be blank")
+    return v
 
 class Contact(BaseModel):
-    name: str
+    name: str = Field(..., min_length=1, max_length=100)
+    email: EmailStr
+    message: str = Field(..., min_length=1, max_length=5000)
+
+    _strip_name = validator('name', allow_reuse=True)(_non_blank)
+    _strip_message = validator('message', allow_reuse=True)(_non_blank)
+
+class BetaSignup(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
     email: EmailStr
-    message: str
+    company: Optional[str] = Field(None, max_length=200)
+    role: Optional[str] = Field(None, max_length=100)
+
+    _strip_name = validator('name', allow_reuse=True)(_non_blank)
@@ -4,10 +4,12 @@ User models for authentication and data validation
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field, validator
 import re
 
+from backend.utils.password_policy import check_password
+
 # Request Models (Input)
 
 class UserRegister(BaseModel):
@@ -20,15 +22,7 @@ class UserRegister(BaseModel):
     @validator('password')
     def validate_password(cls, v):
         """Validate password strength"""
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one number')
-        return v
+        return check_password(v)
     
     @validator('name')
     def validate_name(cls, v):
@@ -46,6 +40,10 @@ class TokenRefresh(BaseModel):
     """Token refresh request"""
     refresh_token: str
 
+class EmailVerification(BaseModel):
+    """Email verification confirmation"""
+    token: str
+
 class PasswordReset(BaseModel):
     """Password reset request"""
     email: EmailStr
@@ -58,15 +56,7 @@ class PasswordResetConfirm(BaseModel):
     @validator('new_password')
     def validate_password(cls, v):
         """Validate password strength"""
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one number')
-        return v
+        return check_password(v)
 
 # Response Models (Output)
 
@@ -80,6 +70,7 @@ class TokenData(BaseModel):
     """Token payload data"""
     user_id: Optional[str] = None
     email: Optional[str] = None
+    generation: int = 0
 
 class UserResponse(BaseModel):
     """User data response (safe - no password)"""
@@ -109,8 +100,25 @@ class UserInDB(BaseModel):
     created_at: datetime
     last_login: Optional[datetime] = None
     updated_at: datetime
+    session_generation: int = 0
 
 class MessageResponse(BaseModel):
     """Generic message response"""
     message: str
     success: bool = True
+
+class SessionRevocation(BaseModel):
+    """Result of revoking every session of a user"""
+    user_id: str
+    session_generation: int
+
+class ImportRowError(BaseModel):
+    """A rejected row of a bulk user import"""
+    row: int
+    email: Optional[str] = None
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    """Bulk user import result"""
+    imported: int
+    failed: List[ImportRowError]
@@ -0,0 +1,192 @@
+# backend/serve.py
+"""
+Production server launcher
+
+    python -m backend.serve
+
+Runs gunicorn with uvicorn workers, tuned from the environment:
+
+- WEB_CONCURRENCY workers, or one per CPU the container may use (cgroup
+  quota, then CPU affinity). The count is exported back as WEB_CONCURRENCY,
+  so backend.database.connection splits DB_MAX_CONNECTIONS across the
+  workers that actually run. HASH_WORKERS is exported the same way, so the
+  workers' bcrypt pools together fit the CPU quota.
+- uvloop and httptools when installed; asyncio and h11 otherwise.
+- X-Forwarded-For is honoured from TRUSTED_PROXIES, so requests report the
+  client's address rather than the load balancer's.
+- Keep-alive, listen backlog, and recycling after MAX_REQUESTS requests with
+  jitter, so workers do not all restart at once.
+- Pending Postgres migrations are applied once, in the master, before any
+  worker starts; workers then skip them.
+- The app is imported in each worker after the fork, never in the master.
+  Pools, caches, the hashing pool and the LISTEN connection are all created
+  by each worker's own lifespan. On SIGTERM a worker runs lifespan shutdown
+  (drains last-login writes and mail) within GRACEFUL_TIMEOUT_SECONDS.
+"""
+
+import asyncio
+import importlib.util
+import math
+import os
+import random
+import shutil
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # uvicorn < 0.30 still ships the worker itself
+    from uvicorn.workers import UvicornWorker
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "10000"))
+WORKERS_PER_CPU = float(os.getenv("WORKERS_PER_CPU", "1"))
+# Longer than the idle timeout of the load balancer in front (commonly 60s), so it never reuses a closed socket
+KEEPALIVE_SECONDS = int(os.getenv("KEEPALIVE_SECONDS", "75"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "20000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", str(MAX_REQUESTS // 10)))
+WORKER_TIMEOUT_SECONDS = int(os.getenv("WORKER_TIMEOUT_SECONDS", "30"))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+# Peers (addresses or CIDRs, comma-separated, or *) whose X-Forwarded-For is believed; the
+# client address behind them is what per-IP rate limits key on
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+
+APP = "backend.main:create_app"
+
+
+def cpu_limit() -> float:
+    """CPUs this process may use: the cgroup v2/v1 quota if there is one, else the affinity mask"""
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return min(available, int(quota) / int(period))
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if quota > 0:
+                return min(available, quota / period)
+        except (OSError, ValueError):
+            pass
+    return available
+
+
+def worker_count() -> int:
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return max(1, math.ceil(cpu_limit() * WORKERS_PER_CPU))
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "lifespan": "on",
+        "factory": True,
+    }
+
+
+def migrate_once():
+    """Apply pending migrations in the master, so workers booting together never race for them"""
+    if os.getenv("STORAGE_BACKEND", "postgres").lower() != "postgres":
+        return
+    if os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() != "true":
+        return
+    from backend.database import migrations
+    asyncio.run(migrations.run())
+    # Inherited by every worker forked from here on
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+
+
+def on_starting(server):
+    migrate_once()
+    # Samples left by a previous run would be summed into the new one
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+    loop, http = TunedUvicornWorker.CONFIG_KWARGS["loop"], TunedUvicornWorker.CONFIG_KWARGS["http"]
+    print(f"🚀 Serving {APP} on {HOST}:{PORT} with {server.cfg.workers} workers ({loop}, {http})")
+
+
+def pre_fork(server, worker):
+    # Anything the master imported is shared with every child; the app must not be among it
+    if "backend.main" in sys.modules:
+        print("⚠️ backend.main was imported before forking; workers will share its state")
+
+
+def post_fork(server, worker):
+    # Forked children start with the master's PRNG state
+    random.seed()
+
+
+def child_exit(server, worker):
+    # A dead worker's live gauge files would otherwise keep counting; prometheus_client directly, because
+    # importing backend.utils.metrics here would register the master's own samples
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Only reached in the workers (preload_app is off); UvicornWorker imports APP itself
+        return APP
+
+
+def hash_workers(workers: int) -> int:
+    """bcrypt processes per web worker, so all the pools together fit the CPU quota"""
+    configured = os.getenv("HASH_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, math.floor(cpu_limit() / workers))
+
+
+def options() -> dict:
+    workers = worker_count()
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ["HASH_WORKERS"] = str(hash_workers(workers))
+    return {
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": TunedUvicornWorker,
+        "preload_app": False,
+        "keepalive": KEEPALIVE_SECONDS,
+        "backlog": BACKLOG,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "timeout": WORKER_TIMEOUT_SECONDS,
+        "graceful_timeout": GRACEFUL_TIMEOUT_SECONDS,
+        "forwarded_allow_ips": TRUSTED_PROXIES,
+        "on_starting": on_starting,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+
+
+def main():
+    Server(options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# backend/utils/action_tokens.py
+"""
+Stateless single-purpose tokens for email links (verification, password reset)
+
+A token is ``<user id>.<expiry>.<signature>``. The HMAC key is derived from
+SECRET_KEY per purpose, so a token for one purpose never verifies for the other.
+The signature also covers the part of the user's row that the action changes:
+the email and is_verified flag for verification, the password hash for a reset.
+Checking a token therefore needs only the user row: no token table and no
+write. Once the action is done the token stops verifying by itself, and a
+reset token also dies if the password changes some other way.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+from typing import Optional
+
+from backend.models.user import UserInDB
+from backend.utils.keys import SECRET_KEY
+
+EMAIL_VERIFY_TOKEN_TTL_SECONDS = int(os.getenv("EMAIL_VERIFY_TOKEN_TTL_SECONDS", str(48 * 3600)))
+PASSWORD_RESET_TOKEN_TTL_SECONDS = int(os.getenv("PASSWORD_RESET_TOKEN_TTL_SECONDS", "1800"))
+
+VERIFY_EMAIL = "verify-email"
+PASSWORD_RESET = "password-reset"
+
+TTLS = {VERIFY_EMAIL: EMAIL_VERIFY_TOKEN_TTL_SECONDS, PASSWORD_RESET: PASSWORD_RESET_TOKEN_TTL_SECONDS}
+_KEYS = {
+    purpose: hmac.new(SECRET_KEY.encode(), f"action-token:{purpose}".encode(), hashlib.sha256).digest()
+    for purpose in TTLS
+}
+
+
+def _bound_state(purpose: str, user: UserInDB) -> bytes:
+    if purpose == PASSWORD_RESET:
+        return user.password_hash.encode()
+    return f"{user.email.lower()}\x1f{int(user.is_verified)}".encode()
+
+
+def _signature(purpose: str, head: str, user: UserInDB) -> str:
+    digest = hmac.new(_KEYS[purpose], head.encode() + b"\x1f" + _bound_state(purpose, user), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue(purpose: str, user: UserInDB) -> str:
+    head = f"{user.id}.{int(time.time()) + TTLS[purpose]}"
+    return f"{head}.{_signature(purpose, head, user)}"
+
+
+def subject(token: str) -> Optional[str]:
+    """User id of a well-formed, unexpired token; the signature still has to be checked against the row"""
+    parts = token.split(".")
+    # isascii: str.isdigit also accepts characters such as "²" that int() rejects
+    if len(parts) != 3 or not (parts[1].isascii() and parts[1].isdigit()) or int(parts[1]) < time.time():
+        return None
+    return parts[0]
+
+
+def verify(purpose: str, token: str, user: UserInDB) -> bool:
+    head, _, signature = token.rpartition(".")
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    return hmac.compare_digest(signature.encode(), _signature(purpose, head, user).encode())
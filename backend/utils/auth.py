@@ -4,37 +4,127 @@ Authentication utilities for ChiefAI Insights
 Handles JWT tokens, password hashing, and authentication logic
 """
 
+import asyncio
+import hashlib
 import os
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from psycopg2.extras import RealDictCursor
-
-from backend.database.connection import get_db
+from backend.database import events
+from backend.database.storage import get_storage
 from backend.models.user import TokenData, UserInDB
+from backend.utils import action_tokens
+from backend.utils.cache import TTLCache
+from backend.utils.hashing import HasherBusy, password_hasher
+from backend.utils.keys import key_ring
+from backend.utils.mailer import send_email_verification, send_password_reset
+from backend.utils.metrics import JWT_OPS
+from backend.utils.tasks import PeriodicTask
 
-# Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
+# Configuration (signing keys live in backend.utils.keys)
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+USER_CHANGES_CHANNEL = "user_changes"
+SESSION_GENERATION_CACHE_SIZE = int(os.getenv("SESSION_GENERATION_CACHE_SIZE", "100000"))
+SESSION_CHANGES_CHANNEL = "session_generations"
+REFRESH_TOKEN_PURGE_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", "300"))
+REFRESH_TOKEN_PURGE_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH_SIZE", "1000"))
+REVOKED_TOKEN_RETENTION_HOURS = int(os.getenv("REVOKED_TOKEN_RETENTION_HOURS", "24"))
+LAST_LOGIN_FLUSH_SIZE = int(os.getenv("LAST_LOGIN_FLUSH_SIZE", "500"))
+LAST_LOGIN_FLUSH_INTERVAL_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL_SECONDS", "5"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_observe_jwt_encode = JWT_OPS.labels("encode").observe
+_observe_jwt_decode = JWT_OPS.labels("decode").observe
 
 # Security scheme
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
+# Authenticated principals, invalidated across workers via NOTIFY on USER_CHANGES_CHANNEL
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+def _on_user_change(payload: str):
+    if payload == "*":
+        user_cache.clear()
+        return
+    for user_id in payload.split(","):
+        user_cache.invalidate(user_id)
+
+events.subscribe(USER_CHANGES_CHANNEL, _on_user_change)
+
+# Latest session generation per user, pushed via NOTIFY on SESSION_CHANGES_CHANNEL. Tokens carry
+# the generation they were minted under ("gen"), so an older one is refused without a row fetch.
+# Entries outlive every token they can reject; an evicted entry falls back to the user record.
+session_generations = TTLCache(maxsize=SESSION_GENERATION_CACHE_SIZE, ttl=REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+def _record_session_generation(user_id: str, generation: int):
+    # Never move backwards: a stale replica read or a late NOTIFY must not un-revoke tokens
+    if generation > (session_generations.get(user_id) or 0):
+        session_generations.set(user_id, generation)
+
+def _on_session_change(payload: str):
+    if payload == "*":
+        # Missed bumps are in the user rows, which the user-cache flush makes us re-read
+        return
+    user_id, _, generation = payload.rpartition(":")
+    _record_session_generation(user_id, int(generation))
+    user_cache.invalidate(user_id)
+
+events.subscribe(SESSION_CHANGES_CHANNEL, _on_session_change)
+
+# Verified access tokens by digest, each kept until its own exp
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+async def revoke_sessions(user_id: str, db) -> Optional[int]:
+    """Invalidate every token issued to a user so far, on every worker; returns
+    the new session generation, or None if there is no such user.
+    Call after a password change or deactivation as well as on "log out everywhere"."""
+    generation = await get_storage().bump_session_generation(db, user_id)
+    if generation is None:
+        return None
+    _record_session_generation(user_id, generation)
+    user_cache.invalidate(user_id)
+    await events.notify(db, SESSION_CHANGES_CHANNEL, f"{user_id}:{generation}")
+    return generation
+
+async def publish_user_change(user_id: str, db):
+    """Drop a user from this worker's cache and tell every other worker to do the same"""
+    await publish_user_changes([user_id], db)
+
+async def publish_user_changes(user_ids: List[str], db):
+    """Invalidate many users, keeping each NOTIFY payload well under Postgres' 8000-byte limit"""
+    for start in range(0, len(user_ids), 100):
+        chunk = user_ids[start:start + 100]
+        for user_id in chunk:
+            user_cache.invalidate(user_id)
+        await events.notify(db, USER_CHANGES_CHANNEL, ",".join(chunk))
+
+def hasher_busy(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+async def hash_password(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy as exc:
+        raise hasher_busy(exc.retry_after)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password against its hash; returns (valid, replacement hash if rehash is due)"""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy as exc:
+        raise hasher_busy(exc.retry_after)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -46,129 +136,265 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    start = time.perf_counter()
+    encoded_jwt = jwt.encode(to_encode, key_ring.signing_key, algorithm=key_ring.algorithm,
+                             headers={"kid": key_ring.kid})
+    _observe_jwt_encode(time.perf_counter() - start)
     return encoded_jwt
 
 def create_refresh_token(data: dict) -> str:
     """Create a JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti keeps two tokens minted in the same second distinct
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
+    start = time.perf_counter()
+    encoded_jwt = jwt.encode(to_encode, key_ring.signing_key, algorithm=key_ring.algorithm,
+                             headers={"kid": key_ring.kid})
+    _observe_jwt_encode(time.perf_counter() - start)
     return encoded_jwt
 
-def decode_token(token: str) -> TokenData:
-    """Decode and validate JWT token"""
+def _invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _session_revoked() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Session revoked",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def check_session_generation(token_data: TokenData):
+    """Refuse a token minted before its user's sessions were last revoked"""
+    current = session_generations.get(token_data.user_id)
+    if current is not None and token_data.generation < current:
+        raise _session_revoked()
+
+def _verify_token(token: str) -> dict:
+    """Check signature and expiry with the key named by the token's kid"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return TokenData(user_id=user_id, email=email)
+        start = time.perf_counter()
+        try:
+            key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                raise _invalid_token()
+            return jwt.decode(token, key, algorithms=[key_ring.algorithm])
+        finally:
+            _observe_jwt_decode(time.perf_counter() - start)
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _invalid_token()
+
+def decode_token(token: str, expected_type: Optional[str] = None) -> TokenData:
+    """Decode and validate JWT token"""
+    digest = token_digest(token)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        token_data, token_type = cached
+    else:
+        payload = _verify_token(token)
+        if payload.get("sub") is None:
+            raise _invalid_token()
+        token_data = TokenData(user_id=payload["sub"], email=payload.get("email"),
+                               generation=payload.get("gen", 0))
+        token_type = payload.get("type")
+        # Refresh tokens are presented once each; caching them would only evict access tokens
+        if token_type == "access":
+            token_cache.set(digest, (token_data, token_type), ttl=payload["exp"] - time.time())
+
+    if expected_type and token_type != expected_type:
+        raise _invalid_token()
+    return token_data
 
-def get_user_by_email(email: str, db) -> Optional[UserInDB]:
+async def get_user_by_email(email: str, db) -> Optional[UserInDB]:
     """Get user by email from database"""
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        """
-        SELECT id, name, email, password_hash, company_name, role, 
-               is_verified, is_active, created_at, last_login, updated_at
-        FROM users WHERE email = %s
-        """,
-        (email,)
-    )
-    user_data = cursor.fetchone()
-    cursor.close()
-    
-    if user_data:
-        return UserInDB(**dict(user_data))
-    return None
+    return await get_storage().fetch_user_by_email(db, email)
 
-def get_user_by_id(user_id: str, db) -> Optional[UserInDB]:
+async def get_user_by_id(user_id: str, db) -> Optional[UserInDB]:
     """Get user by ID from database"""
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        """
-        SELECT id, name, email, password_hash, company_name, role, 
-               is_verified, is_active, created_at, last_login, updated_at
-        FROM users WHERE id = %s
-        """,
-        (user_id,)
-    )
-    user_data = cursor.fetchone()
-    cursor.close()
-    
-    if user_data:
-        return UserInDB(**dict(user_data))
-    return None
+    return await get_storage().fetch_user_by_id(db, user_id)
+
+async def _read_replica_first(operation: str, *args):
+    """Run a storage read on the replica when there is one; fall back to the
+    primary if the replica fails or misses (it may lag behind a fresh write)"""
+    storage = get_storage()
+    if storage.has_replica:
+        try:
+            async with storage.acquire(readonly=True) as db:
+                result = await getattr(storage, operation)(db, *args)
+            if result is not None:
+                return result
+        except Exception as exc:
+            print(f"⚠️ Replica read failed, using primary: {exc}")
+    async with storage.acquire() as db:
+        return await getattr(storage, operation)(db, *args)
 
-def authenticate_user(email: str, password: str, db) -> Optional[UserInDB]:
+async def create_user(user_id: str, name: str, email: str, password_hash: str,
+                      company_name: Optional[str], db) -> Optional[UserInDB]:
+    """Create a user; returns None if the email is already registered"""
+    return await get_storage().insert_user(db, user_id, name, email, password_hash, company_name)
+
+async def authenticate_user(email: str, password: str, db) -> Optional[UserInDB]:
     """Authenticate user with email and password"""
-    user = get_user_by_email(email, db)
-    if not user or not verify_password(password, user.password_hash):
+    user = await get_user_by_email(email, db)
+    if not user:
+        return None
+    valid, new_hash = await verify_password(password, user.password_hash)
+    if not valid:
         return None
+    if new_hash:
+        await get_storage().update_password_hash(db, user.id, new_hash)
+        await publish_user_change(user.id, db)
+        user.password_hash = new_hash
     return user
 
-def update_last_login(user_id: str, db):
-    """Update user's last login timestamp"""
-    cursor = db.cursor()
-    cursor.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (user_id,))
-    cursor.close()
-    db.commit()
+def send_verification_email(user: UserInDB):
+    """Queue a verification link; delivery happens off the request path"""
+    send_email_verification(user.email, user.name, action_tokens.issue(action_tokens.VERIFY_EMAIL, user))
+
+async def send_password_reset_email(email: str):
+    """Look the account up and queue a reset link if it exists; run after the response is sent"""
+    try:
+        async with get_storage().acquire() as db:
+            user = await get_user_by_email(email, db)
+    except Exception as exc:
+        print(f"⚠️ Password reset lookup failed: {exc}")
+        return
+    if user is not None and user.is_active:
+        send_password_reset(user.email, user.name, action_tokens.issue(action_tokens.PASSWORD_RESET, user))
+
+async def redeem_action_token(purpose: str, token: str, db) -> Optional[UserInDB]:
+    """The user an email-link token was issued to, if it is still valid for ``purpose``"""
+    user_id = action_tokens.subject(token)
+    if user_id is None:
+        return None
+    # Primary, not the replica: a lagging row could still carry the state a used token was bound to
+    user = await get_user_by_id(user_id, db)
+    if user is None or not action_tokens.verify(purpose, token, user):
+        return None
+    return user
+
+async def mark_email_verified(user_id: str, db):
+    await get_storage().mark_email_verified(db, user_id)
+    await publish_user_change(user_id, db)
+
+async def reset_password(user: UserInDB, new_password: str, db) -> bool:
+    """Set a new password unless it changed since the reset token was checked, then end every session"""
+    password_hash = await hash_password(new_password)
+    if not await get_storage().replace_password_hash(db, user.id, user.password_hash, password_hash):
+        return False
+    await revoke_sessions(user.id, db)
+    return True
+
+class LastLoginBuffer:
+    """Write-behind buffer that coalesces login timestamps per user and flushes them in bulk"""
+
+    def __init__(self, flush_size: int, flush_interval: float):
+        self.flush_size = flush_size
+        self._pending: Dict[str, datetime] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.timer = PeriodicTask("Last-login flush", flush_interval, self.flush)
+
+    def record(self, user_id: str):
+        self._pending[user_id] = datetime.now(timezone.utc)
+        if len(self._pending) >= self.flush_size and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_in_background())
+
+    async def _flush_in_background(self):
+        try:
+            await self.flush()
+        except Exception as exc:
+            print(f"⚠️ Last-login flush failed: {exc}")
+        finally:
+            self._flush_task = None
 
-def store_refresh_token(user_id: str, token: str, db):
+    async def flush(self):
+        """Write every buffered timestamp with one UPDATE"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            async with get_storage().acquire() as db:
+                await get_storage().bulk_update_last_login(db, list(batch), list(batch.values()))
+                await publish_user_changes(list(batch), db)
+        except Exception:
+            # Put the batch back without clobbering logins recorded meanwhile
+            batch.update(self._pending)
+            self._pending = batch
+            raise
+
+    def start(self):
+        self.timer.start()
+
+    async def drain(self):
+        """Stop the timer and flush whatever is left; called on shutdown"""
+        await self.timer.stop()
+        if self._flush_task is not None:
+            await self._flush_task
+        try:
+            await self.flush()
+        except Exception as exc:
+            print(f"⚠️ Dropped {len(self._pending)} last-login updates on shutdown: {exc}")
+
+last_login_buffer = LastLoginBuffer(LAST_LOGIN_FLUSH_SIZE, LAST_LOGIN_FLUSH_INTERVAL_SECONDS)
+
+def update_last_login(user_id: str):
+    """Record a login; the timestamp reaches the database on the next buffer flush"""
+    last_login_buffer.record(user_id)
+
+def token_digest(token: str) -> bytes:
+    """Fixed-length key under which a refresh token is stored"""
+    return hashlib.sha256(token.encode()).digest()
+
+async def store_refresh_token(user_id: str, token: str, db):
     """Store refresh token in database"""
-    cursor = db.cursor()
-    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    cursor.execute(
-        "INSERT INTO refresh_tokens (user_id, token, expires_at) VALUES (%s, %s, %s)",
-        (user_id, token, expires_at)
+    await get_storage().insert_refresh_token(
+        db, user_id, token_digest(token), timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
-    cursor.close()
-    db.commit()
-
-def validate_refresh_token(token: str, db) -> Optional[str]:
-    """Validate refresh token and return user_id if valid"""
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        "SELECT user_id, expires_at, is_revoked FROM refresh_tokens WHERE token = %s",
-        (token,)
-    )
-    token_data = cursor.fetchone()
-    cursor.close()
-    
-    if not token_data or token_data['is_revoked'] or token_data['expires_at'] < datetime.utcnow():
-        return None
-    return token_data['user_id']
 
-def revoke_refresh_token(token: str, db):
+async def revoke_refresh_token(token: str, db):
     """Revoke a refresh token"""
-    cursor = db.cursor()
-    cursor.execute("UPDATE refresh_tokens SET is_revoked = TRUE WHERE token = %s", (token,))
-    cursor.close()
-    db.commit()
+    await get_storage().revoke_refresh_token(db, token_digest(token))
+
+async def rotate_refresh_token(user_id: str, old_token: str, new_token: str, db) -> Tuple[Optional[str], bool]:
+    """Swap a refresh token for its successor in one statement; returns (owner email or None, reuse detected)"""
+    return await get_storage().rotate_refresh_token(
+        db, user_id, token_digest(old_token), token_digest(new_token),
+        timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+async def purge_refresh_tokens():
+    """Batch-delete expired and long-revoked refresh tokens"""
+    retention = timedelta(hours=REVOKED_TOKEN_RETENTION_HOURS)
+    while True:
+        async with get_storage().acquire() as db:
+            deleted = await get_storage().purge_refresh_tokens(db, retention, REFRESH_TOKEN_PURGE_BATCH_SIZE)
+        if deleted < REFRESH_TOKEN_PURGE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0)
+
+refresh_token_purger = PeriodicTask(
+    "Refresh token purge", REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, purge_refresh_tokens
+)
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> UserInDB:
     """Dependency to get current authenticated user"""
     token = credentials.credentials
     token_data = decode_token(token)
-    user = get_user_by_id(token_data.user_id, db)
+    check_session_generation(token_data)
+    user = user_cache.get(token_data.user_id)
+    
+    if user is None:
+        # Only touch the pool on a cache miss
+        generation = user_cache.generation
+        user = await _read_replica_first("fetch_user_by_id", token_data.user_id)
+        if user is not None:
+            user_cache.set(user.id, user, generation=generation)
     
     if user is None:
         raise HTTPException(
@@ -177,6 +403,11 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if token_data.generation < user.session_generation:
+        # A revocation this worker has not heard about (restart, evicted entry)
+        _record_session_generation(user.id, user.session_generation)
+        raise _session_revoked()
+    
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
     
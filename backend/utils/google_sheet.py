@@ -1,12 +1,147 @@
-# requirements.txt addition
+# backend/utils/google_sheet.py
+"""
+Google Sheets gateway
+Caches the authorized worksheet, batches appended rows, and serves reads
+through one pooled HTTP client with ETag/TTL caching
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from backend.utils.tasks import PeriodicTask
+
+if TYPE_CHECKING:
+    import httpx
+
+GOOGLE_SHEETS_API_URL = os.getenv("GOOGLE_SHEETS_API_URL", "https://sheets.googleapis.com/v4")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "YOUR_API_KEY")
+SHEET_FLUSH_SIZE = int(os.getenv("SHEET_FLUSH_SIZE", "50"))
+SHEET_FLUSH_INTERVAL_SECONDS = float(os.getenv("SHEET_FLUSH_INTERVAL_SECONDS", "5"))
+SHEET_READ_CACHE_TTL_SECONDS = float(os.getenv("SHEET_READ_CACHE_TTL_SECONDS", "30"))
+
+
+def open_contact_worksheet():
+    """Authorize with the service account and open the contact sheet (blocking)"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    service_account_info = json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"])
+    creds = Credentials.from_service_account_info(
+        service_account_info,
+        scopes=["https://www.googleapis.com/auth/spreadsheets"]
+    )
+    client = gspread.authorize(creds)
+    return client.open_by_key(os.environ["GOOGLE_SHEET_ID"]).sheet1
+
+
+class SheetsGateway:
+    """Buffered writes through a cached gspread worksheet and cached reads over a shared AsyncClient"""
+
+    def __init__(self, worksheet_factory: Callable[[], Any] = open_contact_worksheet,
+                 flush_size: int = SHEET_FLUSH_SIZE, flush_interval: float = SHEET_FLUSH_INTERVAL_SECONDS,
+                 read_ttl: float = SHEET_READ_CACHE_TTL_SECONDS):
+        self.worksheet_factory = worksheet_factory
+        self.flush_size = flush_size
+        self.read_ttl = read_ttl
+        self.timer = PeriodicTask("Sheets flush", flush_interval, self.flush)
+        self._worksheet = None
+        self._rows: List[List[Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._read_cache: Dict[str, Tuple[float, Optional[str], Any]] = {}
+
+    def append(self, row: List[Any]):
+        """Buffer a row; it is written on the next size- or timer-triggered flush"""
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_size and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_in_background())
+
+    async def _flush_in_background(self):
+        try:
+            await self.flush()
+        except Exception as exc:
+            print(f"⚠️ Sheets flush failed: {exc}")
+        finally:
+            self._flush_task = None
+
+    def _append_rows(self, rows: List[List[Any]]):
+        if self._worksheet is None:
+            self._worksheet = self.worksheet_factory()
+        try:
+            self._worksheet.append_rows(rows, value_input_option="RAW")
+        except Exception:
+            # Re-authorize on the next attempt in case the handle went stale
+            self._worksheet = None
+            raise
+
+    async def flush(self):
+        """Write every buffered row with a single append_rows call"""
+        async with self._flush_lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            try:
+                await asyncio.to_thread(self._append_rows, rows)
+            except Exception:
+                self._rows = rows + self._rows
+                raise
+
+    async def append_now(self, rows: List[List[Any]]):
+        """Write rows immediately, bypassing the buffer; raises if the append fails"""
+        async with self._flush_lock:
+            await asyncio.to_thread(self._append_rows, rows)
+
+    def _http(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported on first read; most workers never read a sheet
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=GOOGLE_SHEETS_API_URL,
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def read(self, sheet_id: str) -> Any:
+        """Fetch spreadsheet metadata, served from cache within the TTL and revalidated by ETag after"""
+        now = time.monotonic()
+        cached = self._read_cache.get(sheet_id)
+        if cached and cached[0] > now:
+            return cached[2]
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+        response = await self._http().get(
+            f"/spreadsheets/{sheet_id}", params={"key": GOOGLE_API_KEY}, headers=headers
+        )
+        if response.status_code == 304 and cached:
+            body, etag = cached[2], cached[1]
+        else:
+            body, etag = response.json(), response.headers.get("ETag")
+            if response.status_code != 200:
+                return body
+        self._read_cache[sheet_id] = (now + self.read_ttl, etag, body)
+        return body
+
+    def start(self):
+        self.timer.start()
+
+    async def stop(self):
+        """Flush buffered rows and close the HTTP client; called on shutdown"""
+        await self.timer.stop()
+        try:
+            await self.flush()
+        except Exception as exc:
+            print(f"⚠️ Dropped {len(self._rows)} sheet rows on shutdown: {exc}")
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+sheets_gateway = SheetsGateway()
 
-# In your code
-import httpx
 
 async def read_google_sheet(sheet_id: str):
-    url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}"
-    # Use API key authentication (simpler than OAuth)
-    params = {"key": "YOUR_API_KEY"}
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        return response.json()
+    return await sheets_gateway.read(sheet_id)
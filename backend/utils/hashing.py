@@ -0,0 +1,148 @@
+# backend/utils/hashing.py
+"""
+Async password hashing for ChiefAI Insights
+Runs bcrypt in a bounded process pool so hashing never blocks the event loop
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from backend.utils.metrics import HASHER_REJECTED, PASSWORD_HASH
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _default_hash_workers() -> int:
+    # Every web worker gets its own pool; together they should not outnumber the CPUs.
+    # backend.serve exports HASH_WORKERS from the cgroup quota, which affinity does not reflect.
+    return max(1, _available_cpus() // max(1, int(os.getenv("WEB_CONCURRENCY", "1"))))
+
+
+# Configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(_default_hash_workers())))
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", str(HASH_WORKERS * 8)))
+# In-flight verifications may only take this much of the queue, so a login flood leaves room for registrations
+HASH_VERIFY_LIMIT = int(os.getenv("HASH_VERIFY_LIMIT", str(max(1, HASH_QUEUE_DEPTH * 3 // 4))))
+
+_pwd_context = None
+
+
+def pwd_context():
+    """The bcrypt CryptContext, built on first use; only the pool's child processes hash"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        # Pinning min and max rounds to the configured cost makes needs_update() flag
+        # any stored hash produced with a different cost factor.
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+            bcrypt__max_rounds=BCRYPT_ROUNDS,
+        )
+    return _pwd_context
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full and the request should be shed"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+
+def _verify(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    context = pwd_context()
+    if not context.verify(password, hashed):
+        return False, None
+    if context.needs_update(hashed):
+        return True, context.hash(password)
+    return True, None
+
+
+class PasswordHasher:
+    """Awaitable bcrypt hash/verify backed by a process pool with a queue-depth limit"""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_QUEUE_DEPTH,
+                 verify_limit: int = HASH_VERIFY_LIMIT):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.verify_limit = max(1, min(verify_limit, self.max_pending))
+        self.pending = 0
+        self.verifying = 0
+        # Moving average of one operation's run time, for Retry-After estimates
+        self._op_seconds = 0.25
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Create the process pool; called from the app lifespan"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        """Tear down the process pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def retry_after(self) -> int:
+        """Whole seconds until the current backlog should have drained"""
+        return max(1, math.ceil(self.pending / self.workers * self._op_seconds))
+
+    def verify_saturated(self) -> bool:
+        """True when a new verification would be shed"""
+        return self.verifying >= self.verify_limit or self.pending >= self.max_pending
+
+    async def _submit(self, op: str, fn, *args):
+        if self.pending >= self.max_pending:
+            HASHER_REJECTED.inc()
+            raise HasherBusy(f"{self.pending} password operations already queued", self.retry_after())
+        self.start()
+        # Rounds of work queued ahead of this call, including its own
+        rounds = self.pending // self.workers + 1
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - start
+            PASSWORD_HASH.labels(op).observe(elapsed)
+            self._op_seconds += 0.1 * (elapsed / rounds - self._op_seconds)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._submit("hash", _hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; on success also returns a fresh hash if the stored one is outdated"""
+        if self.verifying >= self.verify_limit:
+            HASHER_REJECTED.inc()
+            raise HasherBusy(f"{self.verifying} password verifications in flight", self.retry_after())
+        self.verifying += 1
+        try:
+            return await self._submit("verify", _verify, password, hashed)
+        finally:
+            self.verifying -= 1
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,234 @@
+# backend/utils/intake.py
+"""
+Contact and beta intake outbox
+
+A submission costs the request one INSERT into the outbox (``enqueue``). Each
+worker runs an IntakeWorker that claims due rows in batches (FOR UPDATE SKIP
+LOCKED on Postgres, so workers never wait on each other) and fans every row
+out to its effects: the Sheets row and, for beta signups, the thank-you and
+admin emails. All sheet rows of a batch go out in one append and all its mail
+over one SMTP session, and both are confirmed before a row is marked sent.
+
+Effects already delivered are recorded per row, so a retry repeats only what
+failed. Failed rows come back after exponential backoff; after
+INTAKE_MAX_ATTEMPTS, or on a permanent error (a rejected recipient), they are
+marked dead and kept for inspection. Rows claimed by a worker that dies
+reappear when their INTAKE_LEASE_SECONDS lease runs out.
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.database.storage import IntakeItem, IntakeResult, get_storage
+from backend.utils.google_sheet import sheets_gateway
+from backend.utils.mailer import ADMIN_EMAIL, SMTPSession, admin_notice_message, is_transient, thank_you_message
+from backend.utils.metrics import INTAKE_EVENTS
+from backend.utils.tasks import PeriodicTask
+
+INTAKE_BATCH_SIZE = int(os.getenv("INTAKE_BATCH_SIZE", "50"))
+INTAKE_POLL_INTERVAL_SECONDS = float(os.getenv("INTAKE_POLL_INTERVAL_SECONDS", "2"))
+INTAKE_LEASE_SECONDS = int(os.getenv("INTAKE_LEASE_SECONDS", "120"))
+INTAKE_MAX_ATTEMPTS = int(os.getenv("INTAKE_MAX_ATTEMPTS", "8"))
+INTAKE_RETRY_BASE_SECONDS = float(os.getenv("INTAKE_RETRY_BASE_SECONDS", "10"))
+INTAKE_RETRY_MAX_SECONDS = float(os.getenv("INTAKE_RETRY_MAX_SECONDS", "3600"))
+INTAKE_RETENTION_DAYS = int(os.getenv("INTAKE_RETENTION_DAYS", "30"))
+INTAKE_PURGE_BATCH_SIZE = int(os.getenv("INTAKE_PURGE_BATCH_SIZE", "1000"))
+
+CONTACT = "contact"
+BETA = "beta"
+
+SHEET = "sheet"
+THANK_YOU = "thank_you"
+ADMIN = "admin"
+
+# Effects each kind fans out to, in delivery order
+EFFECTS = {
+    CONTACT: (SHEET,),
+    BETA: (SHEET, THANK_YOU, ADMIN),
+}
+
+
+def sheet_row(kind: str, payload: dict) -> List[Any]:
+    if kind == CONTACT:
+        return [payload["name"], payload["email"], payload["message"]]
+    return [payload["name"], payload["email"], payload.get("company") or "", payload.get("role") or ""]
+
+
+def _thank_you(payload: dict):
+    return thank_you_message(payload["email"], payload["name"])
+
+
+def _admin_notice(payload: dict):
+    if not ADMIN_EMAIL:
+        return None
+    return admin_notice_message(payload["name"], payload["email"], payload.get("company"), payload.get("role"))
+
+
+# Build the message for a mail effect; None means there is nothing to send
+MESSAGES: Dict[str, Callable[[dict], Any]] = {THANK_YOU: _thank_you, ADMIN: _admin_notice}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(INTAKE_RETRY_MAX_SECONDS, INTAKE_RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+
+class IntakeWorker:
+    """Drains the outbox on this worker's event loop; woken early by local submissions"""
+
+    def __init__(self, batch_size: int = INTAKE_BATCH_SIZE, poll_interval: float = INTAKE_POLL_INTERVAL_SECONDS,
+                 lease_seconds: int = INTAKE_LEASE_SECONDS, max_attempts: int = INTAKE_MAX_ATTEMPTS):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.purger = PeriodicTask("Intake purge", 3600, self.purge)
+        self._session = SMTPSession()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def notify(self):
+        """Ask the loop to claim now rather than at the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self.purger.start()
+
+    async def stop(self, timeout: float = 10.0):
+        """Let the batch in flight finish within ``timeout``; unfinished rows return when their lease expires"""
+        await self.purger.stop()
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stopping = True
+        self.notify()
+        try:
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            print("⚠️ Intake batch still running at shutdown; its rows will be retried")
+        await asyncio.to_thread(self._session.close)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                claimed = await self.process_batch()
+            except Exception as exc:
+                print(f"⚠️ Intake batch failed: {exc}")
+                claimed = 0
+            # A full batch means more rows are probably due
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def process_batch(self) -> int:
+        """Claim due rows, deliver their outstanding effects and record the outcome; returns rows claimed"""
+        storage = get_storage()
+        async with storage.acquire() as db:
+            items = await storage.claim_intake(db, self.batch_size, self.lease)
+        if not items:
+            return 0
+
+        done = {item.id: list(item.done) for item in items}
+        # Row id -> (error, permanent)
+        errors: Dict[int, Tuple[str, bool]] = {}
+
+        def outstanding(item: IntakeItem):
+            return [effect for effect in EFFECTS.get(item.kind, ()) if effect not in item.done]
+
+        # A payload that cannot be rendered will never succeed; dead-letter it instead of failing the batch
+        rows = []
+        for item in items:
+            if SHEET not in outstanding(item):
+                continue
+            try:
+                rows.append((item, sheet_row(item.kind, item.payload)))
+            except Exception as exc:
+                errors[item.id] = (f"{SHEET}: {exc!r}", True)
+        if rows:
+            try:
+                await sheets_gateway.append_now([row for _, row in rows])
+            except Exception as exc:
+                for item, _ in rows:
+                    errors[item.id] = (f"{SHEET}: {exc}", False)
+            else:
+                for item, _ in rows:
+                    done[item.id].append(SHEET)
+
+        mail = []
+        for item in items:
+            for effect in outstanding(item):
+                if effect not in MESSAGES:
+                    continue
+                try:
+                    message = MESSAGES[effect](item.payload)
+                except Exception as exc:
+                    errors[item.id] = (f"{effect}: {exc!r}", True)
+                    continue
+                if message is None:
+                    done[item.id].append(effect)
+                else:
+                    mail.append((item, effect, message))
+        if mail:
+            try:
+                failures = dict(await asyncio.to_thread(self._session.send_batch, [m for _, _, m in mail]))
+            except Exception as exc:
+                failures = {index: exc for index in range(len(mail))}
+            for index, (item, effect, _) in enumerate(mail):
+                exc = failures.get(index)
+                if exc is None:
+                    done[item.id].append(effect)
+                elif item.id not in errors or not is_transient(exc):
+                    errors[item.id] = (f"{effect}: {exc}", not is_transient(exc))
+
+        results = []
+        for item in items:
+            if item.kind not in EFFECTS:
+                results.append(IntakeResult(item.id, "dead", done[item.id], f"unknown kind {item.kind!r}"))
+            elif item.id not in errors:
+                results.append(IntakeResult(item.id, "sent", done[item.id]))
+            else:
+                error, permanent = errors[item.id]
+                if permanent or item.attempts >= self.max_attempts:
+                    print(f"❌ Intake {item.id} ({item.kind}) dead after {item.attempts} attempts: {error}")
+                    results.append(IntakeResult(item.id, "dead", done[item.id], error))
+                else:
+                    results.append(IntakeResult(item.id, "pending", done[item.id], error, retry_delay(item.attempts)))
+            INTAKE_EVENTS.labels(results[-1].status).inc()
+
+        async with storage.acquire() as db:
+            await storage.finish_intake(db, results)
+        return len(items)
+
+    async def purge(self):
+        """Batch-delete rows sent longer than INTAKE_RETENTION_DAYS ago; dead rows are kept"""
+        retention = timedelta(days=INTAKE_RETENTION_DAYS)
+        while True:
+            async with get_storage().acquire() as db:
+                deleted = await get_storage().purge_intake(db, retention, INTAKE_PURGE_BATCH_SIZE)
+            if deleted < INTAKE_PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+
+
+intake_worker = IntakeWorker()
+
+
+async def enqueue(kind: str, payload: dict, idempotency_key: str, db) -> bool:
+    """Record a submission; False if the key was seen before. Delivery happens in the background."""
+    created = await get_storage().enqueue_intake(db, idempotency_key, kind, payload)
+    INTAKE_EVENTS.labels("enqueued" if created else "duplicate").inc()
+    if created:
+        intake_worker.notify()
+    return created
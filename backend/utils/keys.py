@@ -0,0 +1,75 @@
+# backend/utils/keys.py
+"""
+JWT signing and verification keys
+
+Key objects are built once at import instead of on every encode/decode.
+
+HS* algorithms sign with SECRET_KEY. For ES*/RS* set JWT_PRIVATE_KEY_FILE to
+the current PEM private key and JWT_KEY_ID to its kid. Public keys that were
+retired but may still have tokens in flight go in JWT_PUBLIC_KEYS_DIR as
+``<kid>.pem``. Other services can verify our tokens from the JWKS document
+without calling us.
+"""
+
+import os
+from typing import Dict, Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE")
+JWT_PUBLIC_KEYS_DIR = os.getenv("JWT_PUBLIC_KEYS_DIR")
+JWT_KEY_ID = os.getenv("JWT_KEY_ID", "default")
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class KeyRing:
+    """The current signing key plus every key a token may still be verified with, by kid"""
+
+    def __init__(self, algorithm: str, kid: str, signing_key: Key, verify_keys: Dict[str, Key]):
+        self.algorithm = algorithm
+        self.kid = kid
+        self.signing_key = signing_key
+        self.verify_keys = verify_keys
+        self.asymmetric = not algorithm.startswith("HS")
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Key for a token's ``kid`` header; tokens without one predate rotation and use the current key"""
+        if kid is None:
+            return self.verify_keys.get(self.kid)
+        return self.verify_keys.get(kid)
+
+    def jwks(self) -> dict:
+        """Public keys as a JWK Set; empty for shared-secret algorithms"""
+        if not self.asymmetric:
+            return {"keys": []}
+        return {"keys": [
+            {**key.to_dict(), "kid": kid, "alg": self.algorithm, "use": "sig"}
+            for kid, key in self.verify_keys.items()
+        ]}
+
+
+def load_key_ring() -> KeyRing:
+    if ALGORITHM.startswith("HS"):
+        key = jwk.construct(SECRET_KEY, ALGORITHM)
+        return KeyRing(ALGORITHM, JWT_KEY_ID, key, {JWT_KEY_ID: key})
+
+    if not JWT_PRIVATE_KEY_FILE:
+        raise ValueError(f"JWT_PRIVATE_KEY_FILE must be set for {ALGORITHM}")
+    signing_key = jwk.construct(_read(JWT_PRIVATE_KEY_FILE), ALGORITHM)
+    verify_keys = {}
+    if JWT_PUBLIC_KEYS_DIR:
+        for name in sorted(os.listdir(JWT_PUBLIC_KEYS_DIR)):
+            if name.endswith(".pem"):
+                verify_keys[name[:-4]] = jwk.construct(_read(os.path.join(JWT_PUBLIC_KEYS_DIR, name)), ALGORITHM)
+    verify_keys[JWT_KEY_ID] = signing_key.public_key()
+    return KeyRing(ALGORITHM, JWT_KEY_ID, signing_key, verify_keys)
+
+
+key_ring = load_key_ring()
@@ -1,36 +1,227 @@
-import os, smtplib
+import asyncio
+import html
+import itertools
+import os
+import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Dict, List, Optional, Tuple
 
 MAIL_USER = os.getenv("MAIL_USERNAME")
 MAIL_PASS = os.getenv("MAIL_PASSWORD")
 MAIL_FROM = os.getenv("MAIL_FROM", MAIL_USER)
 MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
 MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
+MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "true").lower() == "true"
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
+# Where the links in verification and reset emails point
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000").rstrip("/")
 
-def send_mail(to_addr: str, subject: str, html_body: str):
+# Dispatcher tuning
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "10000"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "5"))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "2"))
+MAIL_SESSION_IDLE_SECONDS = float(os.getenv("MAIL_SESSION_IDLE_SECONDS", "60"))
+
+
+def _build_message(to_addr: str, subject: str, html_body: str) -> MIMEMultipart:
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = MAIL_FROM
     msg["To"] = to_addr
     msg.attach(MIMEText(html_body, "html"))
+    return msg
 
-    with smtplib.SMTP(MAIL_SERVER, MAIL_PORT) as server:
-        server.starttls()
-        server.login(MAIL_USER, MAIL_PASS)
-        server.send_message(msg)
 
-def send_thank_you(user_email: str, name: str):
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPException, OSError))
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, reused across batches (blocking; run in a thread)"""
+
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(MAIL_SERVER, MAIL_PORT, timeout=30)
+        try:
+            if MAIL_USE_TLS:
+                server.starttls()
+            if MAIL_USER:
+                server.login(MAIL_USER, MAIL_PASS)
+        except BaseException:
+            # Don't leak the socket when the handshake fails
+            server.close()
+            raise
+        self.server = server
+
+    def close(self):
+        server, self.server = self.server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def send_batch(self, messages: List[MIMEMultipart]) -> List[Tuple[int, Exception]]:
+        """Send messages over this session; returns (index, error) for each one that failed"""
+        if self.server is not None and time.monotonic() - self.last_used > MAIL_SESSION_IDLE_SECONDS:
+            self.close()
+        failures = []
+        for index, msg in enumerate(messages):
+            try:
+                if self.server is None:
+                    self._connect()
+                self.server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as exc:
+                # The session is gone; fail the rest of the batch and reconnect next time
+                self.close()
+                failures.extend((i, exc) for i in range(index, len(messages)))
+                break
+            except smtplib.SMTPException as exc:
+                failures.append((index, exc))
+        self.last_used = time.monotonic()
+        return failures
+
+
+class MailDispatcher:
+    """Asyncio mail queue drained by a small pool of reused SMTP sessions"""
+
+    def __init__(self, pool_size: int = MAIL_POOL_SIZE, batch_size: int = MAIL_BATCH_SIZE,
+                 max_queue: int = MAIL_QUEUE_SIZE, max_retries: int = MAIL_MAX_RETRIES):
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # Messages waiting out a retry backoff: id -> (timer, message, attempt)
+        self._retries: Dict[int, Tuple[asyncio.TimerHandle, MIMEMultipart, int]] = {}
+        self._retry_ids = itertools.count()
+        self.sent = 0
+        self.failed = 0
+        self._sessions: List[SMTPSession] = []
+        self._workers: List[asyncio.Task] = []
+
+    def enqueue(self, msg: MIMEMultipart, attempt: int = 0) -> bool:
+        """Queue a message for delivery without waiting; False if the queue is full"""
+        try:
+            self.queue.put_nowait((msg, attempt))
+        except asyncio.QueueFull:
+            self.failed += 1
+            print(f"⚠️ Mail queue full, dropping message to {msg['To']}")
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "retrying": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+    def start(self):
+        """Spawn one worker per SMTP session; called from the app lifespan"""
+        if self._workers:
+            return
+        loop = asyncio.get_running_loop()
+        for _ in range(self.pool_size):
+            session = SMTPSession()
+            self._sessions.append(session)
+            self._workers.append(loop.create_task(self._worker(session)))
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued mail, and mail waiting to be retried, up to ``timeout`` seconds to go out,
+        then close every session"""
+        if not self._workers:
+            return
+        # Retries still in backoff get their attempt now rather than being dropped with their timers
+        for retry_id in list(self._retries):
+            self._retry_now(retry_id)
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        unsent = self.queue.qsize() + len(self._retries)
+        if unsent:
+            self.failed += unsent
+            print(f"⚠️ Shutting down with {unsent} unsent messages")
+        for handle, _, _ in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for session in self._sessions:
+            await asyncio.to_thread(session.close)
+        self._workers.clear()
+        self._sessions.clear()
+
+    def _retry_later(self, loop: asyncio.AbstractEventLoop, delay: float, msg: MIMEMultipart, attempt: int):
+        retry_id = next(self._retry_ids)
+        self._retries[retry_id] = (loop.call_later(delay, self._retry_now, retry_id), msg, attempt)
+
+    def _retry_now(self, retry_id: int):
+        handle, msg, attempt = self._retries.pop(retry_id)
+        handle.cancel()
+        self.enqueue(msg, attempt)
+
+    async def _worker(self, session: SMTPSession):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                failures = await asyncio.to_thread(session.send_batch, [msg for msg, _ in batch])
+            except Exception as exc:
+                failures = [(index, exc) for index in range(len(batch))]
+            self.sent += len(batch) - len(failures)
+            for index, exc in failures:
+                msg, attempt = batch[index]
+                if attempt < self.max_retries and is_transient(exc):
+                    self._retry_later(loop, MAIL_RETRY_BASE_SECONDS * (2 ** attempt), msg, attempt + 1)
+                else:
+                    self.failed += 1
+                    print(f"⚠️ Giving up on mail to {msg['To']}: {exc}")
+            for _ in batch:
+                self.queue.task_done()
+
+
+mail_dispatcher = MailDispatcher()
+
+
+def send_mail(to_addr: str, subject: str, html_body: str) -> bool:
+    """Queue a message for background delivery and return immediately"""
+    return mail_dispatcher.enqueue(_build_message(to_addr, subject, html_body))
+
+def _first_name(name: str) -> str:
+    parts = name.split()
+    return parts[0] if parts else "there"
+
+def thank_you_message(user_email: str, name: str) -> MIMEMultipart:
     body = f"""
-    <p>Hi {name.split()[0]},</p>
+    <p>Hi {html.escape(_first_name(name))},</p>
     <p>Thank you for joining the <b>Chief AI Insights Beta Program</b>!</p>
     <p>We’ll review your inputs and share tailored insights soon.</p>
     <p>Warm regards,<br><b>Team Chief AI Insights</b></p>
     """
-    send_mail(user_email, "Thanks for Joining Chief AI Insights Beta", body)
+    return _build_message(user_email, "Thanks for Joining Chief AI Insights Beta", body)
 
-def notify_admin(name, email, company, role):
+def send_thank_you(user_email: str, name: str):
+    mail_dispatcher.enqueue(thank_you_message(user_email, name))
+
+def admin_notice_message(name, email, company, role) -> MIMEMultipart:
+    # Submitted through a public form
+    name, email, company, role = (html.escape(str(value)) for value in (name, email, company, role))
     body = f"""
     <h3>New Join Beta Submission</h3>
     <ul>
@@ -40,4 +231,27 @@ def notify_admin(name, email, company, role):
       <li><b>Role:</b> {role}</li>
     </ul>
     """
-    send_mail(ADMIN_EMAIL, f"New Join Beta – {name}", body)
+    return _build_message(ADMIN_EMAIL, f"New Join Beta – {name}", body)
+
+def notify_admin(name, email, company, role):
+    mail_dispatcher.enqueue(admin_notice_message(name, email, company, role))
+
+def send_email_verification(user_email: str, name: str, token: str):
+    link = f"{FRONTEND_URL}/verify-email?token={token}"
+    body = f"""
+    <p>Hi {_first_name(name)},</p>
+    <p>Please confirm your email address for <b>Chief AI Insights</b>:</p>
+    <p><a href="{link}">Verify my email</a></p>
+    <p>If you did not create an account, you can ignore this message.</p>
+    """
+    send_mail(user_email, "Verify your email for Chief AI Insights", body)
+
+def send_password_reset(user_email: str, name: str, token: str):
+    link = f"{FRONTEND_URL}/reset-password?token={token}"
+    body = f"""
+    <p>Hi {_first_name(name)},</p>
+    <p>We received a request to reset your <b>Chief AI Insights</b> password.</p>
+    <p><a href="{link}">Choose a new password</a> (the link expires soon and works once).</p>
+    <p>If you did not ask for this, you can ignore this message.</p>
+    """
+    send_mail(user_email, "Reset your Chief AI Insights password", body)
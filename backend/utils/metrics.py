@@ -0,0 +1,123 @@
+# backend/utils/metrics.py
+"""
+Prometheus instrumentation for ChiefAI Insights
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory before the
+workers start; every worker then writes its samples to mmap'd files there and
+/metrics aggregates them, whichever worker serves the scrape. backend.serve
+clears the directory at startup and drops each exited worker's live gauges.
+"""
+
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+FAST_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_connections", "Open connections in the asyncpg pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_idle_connections", "Idle connections in the asyncpg pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_ACQUIRE = Histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pooled connection",
+    buckets=FAST_BUCKETS,
+)
+DB_QUERY = Histogram(
+    "db_query_duration_seconds", "Storage query latency",
+    ["query"], buckets=FAST_BUCKETS,
+)
+PASSWORD_HASH = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify latency including pool queueing",
+    ["op"], buckets=(.01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0),
+)
+JWT_OPS = Histogram(
+    "jwt_seconds", "JWT encode/decode latency",
+    ["op"], buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005),
+)
+HASHER_REJECTED = Counter("password_hash_rejected_total", "Hash requests shed because the queue was full")
+WORKER_STARTUP = Gauge(
+    "worker_startup_seconds", "Time from importing backend.main to the end of lifespan startup",
+    multiprocess_mode="max",
+)
+RATE_LIMITED = Counter("rate_limited_total", "Requests rejected by a rate limit", ["limit"])
+INTAKE_EVENTS = Counter("intake_events_total", "Contact and beta submissions by outcome", ["outcome"])
+
+
+def timed_query(fn):
+    """Record a storage coroutine's latency under its function name"""
+    observe = DB_QUERY.labels(fn.__name__).observe
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            observe(time.perf_counter() - start)
+    return wrapper
+
+
+def record_pool(pool, waited: float):
+    """Sample pool occupancy and acquire wait; called from get_db on every acquire"""
+    DB_POOL_ACQUIRE.observe(waited)
+    DB_POOL_SIZE.set(pool.get_size())
+    DB_POOL_IDLE.set(pool.get_idle_size())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request by route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"], route.path if route else "unmatched", str(status_code)
+            ).observe(elapsed)
+
+
+def render() -> bytes:
+    """Prometheus text exposition for this process, or all workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
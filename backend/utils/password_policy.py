@@ -0,0 +1,181 @@
+# backend/utils/password_policy.py
+"""
+Password policy shared by registration, import and password reset
+
+    python -m backend.utils.password_policy build passwords.txt breached.bloom
+    python -m backend.utils.password_policy build pwned-passwords-sha1.txt breached.bloom --format sha1
+    python -m backend.utils.password_policy check breached.bloom 'Passw0rd'
+
+Character-class rules are checked in one pass over the password. Known-breached
+passwords are rejected with a Bloom filter of their SHA-1 digests, built
+offline by the CLI and named by BREACHED_PASSWORDS_FILE. The filter is mmapped
+on the first check, so workers share it through the page cache instead of
+each loading it at startup. A lookup reads one bit per hash function (10 at
+the default 0.1% false-positive rate). False positives, which reject a
+password that was never breached, happen at the rate the filter was built
+for; false negatives never happen.
+
+The sha1 format reads Have I Been Pwned style files (``HEX`` or ``HEX:count``
+per line); the plain format reads one password per line.
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import string
+import struct
+import sys
+from typing import Iterable, Iterator, Optional
+
+PASSWORD_MIN_LENGTH = 8
+BREACHED_PASSWORDS_FILE = os.getenv("BREACHED_PASSWORDS_FILE")
+
+UPPERCASE = frozenset(string.ascii_uppercase)
+LOWERCASE = frozenset(string.ascii_lowercase)
+DIGITS = frozenset(string.digits)
+
+# magic, bit count, hash count, item count
+HEADER = struct.Struct("<8sQII")
+MAGIC = b"CAIBLM01"
+
+
+def _probes(digest: bytes, bits: int, hashes: int) -> Iterator[int]:
+    """Bit positions for one SHA-1 digest (double hashing over two 64-bit halves)"""
+    h1, h2 = struct.unpack_from("<QQ", digest)
+    h2 |= 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+
+class BloomFilter:
+    """Read-only view of a filter file; the bit array stays in the mapping"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.bits, self.hashes, self.items = HEADER.unpack_from(self._map)
+        if magic != MAGIC or len(self._map) < HEADER.size + (self.bits + 7) // 8:
+            self._map.close()
+            raise ValueError(f"{path} is not a breached-password filter")
+
+    def __contains__(self, digest: bytes) -> bool:
+        data, offset = self._map, HEADER.size
+        return all(data[offset + (bit >> 3)] & (1 << (bit & 7)) for bit in _probes(digest, self.bits, self.hashes))
+
+    def close(self):
+        self._map.close()
+
+
+def build_filter(digests: Iterable[bytes], items: int, path: str, fp_rate: float = 0.001) -> BloomFilter:
+    """Write a filter sized for ``items`` digests at ``fp_rate`` false positives"""
+    items = max(items, 1)
+    bits = max(64, math.ceil(-items * math.log(fp_rate) / math.log(2) ** 2))
+    hashes = max(1, round(-math.log2(fp_rate)))
+    array = bytearray((bits + 7) // 8)
+    added = 0
+    for digest in digests:
+        for bit in _probes(digest, bits, hashes):
+            array[bit >> 3] |= 1 << (bit & 7)
+        added += 1
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, bits, hashes, added))
+        f.write(array)
+    os.replace(tmp, path)
+    return BloomFilter(path)
+
+
+class BreachedPasswords:
+    """The configured filter, opened on first use; every check passes when none is configured"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._filter: Optional[BloomFilter] = None
+        self._disabled = not path
+
+    def __contains__(self, password: str) -> bool:
+        if self._filter is None:
+            if self._disabled:
+                return False
+            try:
+                self._filter = BloomFilter(self.path)
+            except (OSError, ValueError) as exc:
+                print(f"⚠️ Breached-password check disabled: {exc}")
+                self._disabled = True
+                return False
+        return hashlib.sha1(password.encode()).digest() in self._filter
+
+
+breached_passwords = BreachedPasswords(BREACHED_PASSWORDS_FILE)
+
+
+def check_password(password: str) -> str:
+    """Return the password if it meets the policy; raise ValueError naming the first rule it breaks"""
+    if len(password) < PASSWORD_MIN_LENGTH:
+        raise ValueError(f"Password must be at least {PASSWORD_MIN_LENGTH} characters long")
+    chars = frozenset(password)
+    if chars.isdisjoint(UPPERCASE):
+        raise ValueError("Password must contain at least one uppercase letter")
+    if chars.isdisjoint(LOWERCASE):
+        raise ValueError("Password must contain at least one lowercase letter")
+    # \d also accepted non-ASCII decimal digits; keep doing so
+    if chars.isdisjoint(DIGITS) and not any(c.isdecimal() for c in chars):
+        raise ValueError("Password must contain at least one number")
+    if password in breached_passwords:
+        raise ValueError("Password has appeared in a data breach; please choose another")
+    return password
+
+
+def _read_digests(path: str, fmt: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if not line:
+                continue
+            if fmt == "sha1":
+                yield bytes.fromhex(line.split(b":", 1)[0].decode())
+            else:
+                yield hashlib.sha1(line).digest()
+
+
+def _count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.utils.password_policy",
+                                     description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a password list into a filter file")
+    build.add_argument("source")
+    build.add_argument("output")
+    build.add_argument("--format", choices=["plain", "sha1"], default="plain")
+    build.add_argument("--fp-rate", type=float, default=0.001, help="target false-positive rate")
+    build.add_argument("--items", type=int, help="entries in the source (counted if omitted)")
+    check = commands.add_parser("check", help="look passwords up in a filter file")
+    check.add_argument("filter")
+    check.add_argument("passwords", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        items = args.items or _count_lines(args.source)
+        bloom = build_filter(_read_digests(args.source, args.format), items, args.output, args.fp_rate)
+        size = os.path.getsize(args.output)
+        print(f"✅ {bloom.items} entries, {bloom.hashes} hashes, {size / 2**20:.1f} MiB -> {args.output}")
+        bloom.close()
+        return
+
+    bloom = BloomFilter(args.filter)
+    found = False
+    for password in args.passwords:
+        hit = hashlib.sha1(password.encode()).digest() in bloom
+        found |= hit
+        print(f"{'breached' if hit else 'not found'}\t{password}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# backend/utils/profiling.py
+"""
+On-demand request profiling
+
+A request is profiled when it carries a valid X-Profile header (issued by
+POST /api/admin/profiles/token) or, with PROFILE_SAMPLE_RATE > 0, at random.
+While it runs, a background thread samples the request's task every
+PROFILE_INTERVAL_MS:
+
+- when the task is on the CPU, the event loop thread's Python stack;
+- when it is suspended, its await chain, ending in what it waits on (a
+  hashing-pool future, a pool acquire, a query).
+
+So time spent waiting shows up in the profile as well as CPU time. Finished
+profiles go into a ring of the last PROFILE_RING_SIZE, per worker, and are
+served as collapsed stacks (flamegraph.pl, speedscope, inferno) by the admin
+routes.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from backend.utils.keys import SECRET_KEY
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+PROFILE_TOKEN_TTL_SECONDS = int(os.getenv("PROFILE_TOKEN_TTL_SECONDS", "900"))
+PROFILE_HEADER = b"x-profile"
+
+_TOKEN_KEY = hmac.new(SECRET_KEY.encode(), b"request-profiling", hashlib.sha256).digest()
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def issue_token(ttl: int = PROFILE_TOKEN_TTL_SECONDS) -> str:
+    """X-Profile header value that triggers profiling until it expires"""
+    expires = str(int(time.time()) + ttl)
+    return f"{expires}.{hmac.new(_TOKEN_KEY, expires.encode(), hashlib.sha256).hexdigest()}"
+
+
+def valid_token(value: bytes) -> bool:
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    expires, _, signature = value.partition(b".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(_TOKEN_KEY, expires, hashlib.sha256).hexdigest().encode()
+    return hmac.compare_digest(signature, expected)
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _running_stack(frame) -> List[str]:
+    """Loop thread stack, outermost first, below the event loop's callback runner"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "_run" and code.co_filename.startswith(_ASYNCIO_DIR):
+            break
+        frames.append(frame)
+        frame = frame.f_back
+    return [_label(f) for f in reversed(frames)]
+
+
+def _await_chain(coro) -> List[str]:
+    """Suspended coroutine chain, outermost first, ending in what it waits on"""
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_label(frame))
+        awaited = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        if awaited is None:
+            break
+        if not (hasattr(awaited, "cr_frame") or hasattr(awaited, "gi_frame")):
+            labels.append(f"[await {type(awaited).__name__}]")
+            break
+        coro = awaited
+    return labels
+
+
+class Profile:
+    """Samples of one request, as collapsed stacks"""
+
+    def __init__(self, task: asyncio.Task, loop_thread: int, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.task = task
+        self.loop_thread = loop_thread
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.duration_ms = 0.0
+        self.stacks: Counter = Counter()
+
+    def sample(self, frames: Dict[int, object]):
+        loop = self.task.get_loop()
+        if asyncio.current_task(loop) is self.task:
+            stack = ["[cpu]"] + _running_stack(frames.get(self.loop_thread))
+        else:
+            stack = ["[wait]"] + _await_chain(self.task.get_coro())
+        self.stacks[";".join(stack)] += 1
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "route": self.route,
+            "status": self.status, "started_at": self.started_at, "duration_ms": self.duration_ms,
+            "samples": sum(self.stacks.values()),
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Sampler:
+    """One daemon thread sampling every active profile; idle when there are none"""
+
+    def __init__(self, interval: float, ring_size: int):
+        self.interval = interval
+        self.ring: deque = deque(maxlen=ring_size)
+        self._active: Dict[str, Profile] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, method: str, path: str) -> Profile:
+        profile = Profile(asyncio.current_task(), threading.get_ident(), method, path)
+        self._active[profile.id] = profile
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        return profile
+
+    def finish(self, profile: Profile):
+        self._active.pop(profile.id, None)
+        profile.task = None
+        self.ring.append(profile)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self.ring if p.id == profile_id), None)
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.clear()
+                self._wake.wait()
+            frames = sys._current_frames()
+            for profile in list(self._active.values()):
+                try:
+                    profile.sample(frames)
+                except Exception:
+                    # A coroutine can finish under us; drop the sample
+                    pass
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler(PROFILE_INTERVAL_MS / 1000, PROFILE_RING_SIZE)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling requests that ask for it (X-Profile) or are sampled"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return valid_token(value)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = sampler.start(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            route = scope.get("route")
+            profile.route = route.path if route else None
+            sampler.finish(profile)
@@ -0,0 +1,193 @@
+# backend/utils/ratelimit.py
+"""
+Token-bucket rate limiting for ChiefAI Insights
+
+Buckets live in this worker's memory by default. Set RATE_LIMIT_BACKEND=postgres
+to keep them in the UNLOGGED rate_limit_buckets table (created by the
+migrations) so a limit holds across every worker and instance. Limits are FastAPI dependencies; list them in a route's
+``dependencies=[...]`` so a throttled request is rejected before the route
+touches the database or the password hasher.
+"""
+
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from backend.database.storage import get_storage
+from backend.utils.auth import hasher_busy
+from backend.utils.hashing import password_hasher
+from backend.utils.metrics import RATE_LIMITED
+from backend.utils.tasks import PeriodicTask
+
+# Configuration
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_EMAIL_BURST = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+LOGIN_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "2"))
+PASSWORD_RESET_EMAIL_BURST = int(os.getenv("PASSWORD_RESET_EMAIL_BURST", "3"))
+PASSWORD_RESET_EMAIL_PER_MINUTE = float(os.getenv("PASSWORD_RESET_EMAIL_PER_MINUTE", "0.2"))
+INTAKE_IP_BURST = int(os.getenv("INTAKE_IP_BURST", "10"))
+INTAKE_IP_PER_MINUTE = float(os.getenv("INTAKE_IP_PER_MINUTE", "5"))
+
+# Refill by elapsed time, then spend a token if one is available; one round trip, row-locked by the upsert
+TAKE_TOKEN = """
+    INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+    VALUES ($1, $2::float8 - 1, TRUE, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE SET
+        allowed = LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3::float8) >= 1,
+        tokens = LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3::float8)
+                 - CASE WHEN LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3::float8) >= 1
+                        THEN 1 ELSE 0 END,
+        updated_at = clock_timestamp()
+    RETURNING allowed, tokens
+"""
+
+# A bucket untouched this long has refilled completely and carries no state
+PURGE_BUCKETS = "DELETE FROM rate_limit_buckets WHERE updated_at < NOW() - INTERVAL '1 hour'"
+
+
+class RateLimit:
+    """A token-bucket policy: up to ``burst`` requests at once, refilled at ``per_minute``"""
+
+    def __init__(self, name: str, burst: int, per_minute: float):
+        self.name = name
+        self.burst = max(1, burst)
+        self.rate = per_minute / 60
+
+    def retry_after(self, tokens: float) -> int:
+        """Whole seconds until the bucket holds a full token again"""
+        return max(1, math.ceil((1 - tokens) / self.rate)) if self.rate > 0 else 60
+
+
+class MemoryBuckets:
+    """Per-worker buckets, LRU-bounded so a spray of distinct keys cannot grow memory without limit"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def take(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        """Spend one token from ``key``'s bucket; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class PostgresBuckets:
+    """Buckets shared by every worker through Postgres; falls back to local buckets if the database errors"""
+
+    def __init__(self):
+        self.fallback = MemoryBuckets()
+        self._purger = PeriodicTask("Rate limit purge", 600, self._purge)
+
+    async def start(self):
+        storage = get_storage()
+        if storage.name != "postgres":
+            raise ValueError("RATE_LIMIT_BACKEND=postgres requires STORAGE_BACKEND=postgres")
+        self._purger.start()
+
+    async def stop(self):
+        await self._purger.stop()
+
+    async def _purge(self):
+        async with get_storage().acquire() as db:
+            await db.execute(PURGE_BUCKETS)
+
+    async def take(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        try:
+            async with get_storage().acquire() as db:
+                row = await db.fetchrow(TAKE_TOKEN, key, float(limit.burst), limit.rate)
+            return row["allowed"], row["tokens"]
+        except Exception as exc:
+            print(f"⚠️ Shared rate limit unavailable, using local buckets: {exc}")
+            return await self.fallback.take(key, limit)
+
+
+def create_buckets(name: str):
+    if name == "memory":
+        return MemoryBuckets()
+    if name == "postgres":
+        return PostgresBuckets()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; expected 'memory' or 'postgres'")
+
+
+buckets = create_buckets(RATE_LIMIT_BACKEND)
+
+
+async def enforce(limit: RateLimit, subject: str):
+    """Spend a token for ``subject`` under ``limit`` or raise 429 with Retry-After"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    allowed, tokens = await buckets.take(f"{limit.name}:{subject}", limit)
+    if not allowed:
+        RATE_LIMITED.labels(limit.name).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(limit.retry_after(tokens))},
+        )
+
+
+def client_ip(request: Request) -> str:
+    """The client's address; behind a proxy listed in TRUSTED_PROXIES (backend.serve), uvicorn has
+    already replaced the proxy's address with the one it forwarded"""
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(limit: RateLimit):
+    """Dependency throttling each client address"""
+    async def dependency(request: Request):
+        await enforce(limit, client_ip(request))
+    return dependency
+
+
+def limit_by_body_field(limit: RateLimit, field: str):
+    """Dependency throttling each value of a JSON body field (e.g. the email being logged into)"""
+    async def dependency(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return
+        value: Optional[str] = body.get(field) if isinstance(body, dict) else None
+        if isinstance(value, str) and value:
+            # Digest so the bucket table never holds raw identifiers
+            await enforce(limit, hashlib.sha256(value.strip().lower().encode()).hexdigest())
+    return dependency
+
+
+async def require_hasher_capacity():
+    """Dependency shedding a request up front when password verification is saturated"""
+    if password_hasher.verify_saturated():
+        RATE_LIMITED.labels("hasher").inc()
+        raise hasher_busy(password_hasher.retry_after())
+
+
+login_ip_limit = limit_by_ip(RateLimit("login_ip", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE))
+login_email_limit = limit_by_body_field(RateLimit("login_email", LOGIN_EMAIL_BURST, LOGIN_EMAIL_PER_MINUTE), "email")
+# Caps reset mail per address; applied whether or not the account exists
+password_reset_email_limit = limit_by_body_field(
+    RateLimit("password_reset_email", PASSWORD_RESET_EMAIL_BURST, PASSWORD_RESET_EMAIL_PER_MINUTE), "email"
+)
+intake_ip_limit = limit_by_ip(RateLimit("intake_ip", INTAKE_IP_BURST, INTAKE_IP_PER_MINUTE))
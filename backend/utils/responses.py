@@ -0,0 +1,97 @@
+# backend/utils/responses.py
+"""
+orjson response helpers for ChiefAI Insights
+
+Returning a Response from a route makes FastAPI skip response_model
+validation and jsonable_encoder; hot endpoints use these helpers to go
+straight from the stored record to bytes. response_model stays on the route
+for the OpenAPI schema.
+
+Read endpoints that clients poll answer conditional GETs: ``conditional``
+compares If-None-Match with an ETag derived from the record's id and
+updated_at, and on a match sends 304 without rendering the body at all.
+"""
+
+import hashlib
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from backend.models.user import UserResponse
+
+# Z suffix for UTC datetimes, matching pydantic's own JSON output
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+
+# Cache-Control per kind of route
+PRIVATE_REVALIDATE = "private, no-cache"   # per-user data: keep a copy, but ask before reusing it
+PUBLIC_SHORT = "public, max-age=300"       # shared data that may lag a few minutes (JWKS)
+NO_STORE = "no-store"                      # credentials: never written to any cache
+
+# Part of every user ETag, so a change to the response shape invalidates what clients hold
+_USER_SHAPE = hashlib.blake2b(",".join(USER_RESPONSE_FIELDS).encode(), digest_size=4).hexdigest()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson; the app's default response class"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def json_bytes(content: Any, status_code: int = 200) -> Response:
+    """Serialize ``content`` directly, bypassing response_model"""
+    return Response(orjson.dumps(content, option=ORJSON_OPTIONS), status_code=status_code,
+                    media_type="application/json")
+
+
+def preencoded(body: bytes, status_code: int = 200) -> Response:
+    """Response for a body encoded once at import"""
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def user_json(user, status_code: int = 200) -> Response:
+    """The public UserResponse fields of a stored user, without building a UserResponse"""
+    return json_bytes({field: getattr(user, field) for field in USER_RESPONSE_FIELDS}, status_code)
+
+
+def entity_tag(*parts: Any) -> str:
+    """Strong ETag over the parts that identify one version of a representation"""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def user_etag(user) -> str:
+    return entity_tag(_USER_SHAPE, user.id, user.updated_at.isoformat())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 13.1.2), so a W/ prefix is ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def conditional(request: Request, etag: str, render: Callable[[], Response],
+                cache_control: str = PRIVATE_REVALIDATE, vary: Optional[str] = "Authorization") -> Response:
+    """304 when the client already holds ``etag``; otherwise ``render()`` with validators attached"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response = render()
+    response.headers.update(headers)
+    return response
+
+
+def no_store(response: Response) -> Response:
+    """Mark a response carrying credentials as uncacheable"""
+    response.headers["Cache-Control"] = NO_STORE
+    response.headers["Pragma"] = "no-cache"
+    return response
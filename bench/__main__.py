@@ -0,0 +1,108 @@
+# bench/__main__.py
+"""
+Auth API benchmark
+
+    python -m bench --backend memory --concurrency 32 --users 200 --output bench.json
+    python -m bench --backend postgres --compare bench.json
+
+Results are JSON so runs from different commits can be diffed with --compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _compare(current: dict, baseline: dict):
+    print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['backend']})")
+    print(f"{'endpoint':<14}{'rps':>10}{'Δ':>9}{'p95 ms':>10}{'Δ':>9}")
+    for name, result in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base:
+            continue
+        delta = lambda new, old: f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<14}{result['throughput_rps']:>10}{delta(result['throughput_rps'], base['throughput_rps']):>9}"
+              f"{result['p95_ms']:>10}{delta(result['p95_ms'], base['p95_ms']):>9}")
+
+
+async def _run(args) -> dict:
+    from backend.database.storage import set_storage
+    from backend.main import create_app
+    from bench import runner, timing
+    from bench.memory import stub_mail
+
+    if args.backend == "memory":
+        from bench.memory import MemoryBackend
+        set_storage(MemoryBackend())
+    elif args.backend == "sqlite":
+        from backend.database.sqlite import SQLiteBackend
+        set_storage(SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")))
+    else:
+        from backend.database.postgres import PostgresBackend
+        set_storage(PostgresBackend())
+
+    # Registration queues a verification email per user; keep it off the network
+    stub_mail()
+    timing.install()
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        return await runner.run(app, args.concurrency, args.users, args.repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite", "postgres"], default="memory",
+                        help="memory: dicts, no database; sqlite: fresh temp file; postgres: DATABASE_URL")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200, help="accounts to register, log in and refresh")
+    parser.add_argument("--repeat", type=int, default=5, help="/me and /verify-token calls per account")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS for this run")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results from an earlier run to diff against")
+    args = parser.parse_args(argv)
+
+    # Every simulated user logs in from the same address; throttling would only measure the 429 path
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    endpoints = asyncio.run(_run(args))
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "backend": args.backend,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "repeat": args.repeat,
+            "bcrypt_rounds": int(os.getenv("BCRYPT_ROUNDS", "12")),
+            "python": sys.version.split()[0],
+        },
+        "endpoints": endpoints,
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            _compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
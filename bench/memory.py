@@ -0,0 +1,196 @@
+# bench/memory.py
+"""
+In-memory stand-ins for the storage layer and outgoing mail
+
+A dict-backed StorageBackend so benchmarks measure the application alone,
+without the cost of any database, and an outbox that keeps the mail
+registration queues instead of sending it over SMTP.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from backend.database import events
+from backend.database.storage import EXPORT_COLUMNS, IntakeItem, IntakeResult, StorageBackend
+from backend.models.user import UserInDB
+from backend.utils import mailer
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MemoryBackend(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self.users: Dict[str, UserInDB] = {}
+        self.emails: Dict[str, str] = {}
+        self.tokens: Dict[bytes, dict] = {}
+        self.intake: Dict[int, dict] = {}
+        self.intake_keys: Dict[str, int] = {}
+
+    async def startup(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False):
+        yield None
+
+    async def health(self) -> dict:
+        return {"primary": {"round_trip_ms": 0.0}}
+
+    async def notify(self, db, channel: str, payload: str):
+        events.deliver(channel, payload)
+
+    async def fetch_user_by_email(self, db, email: str) -> Optional[UserInDB]:
+        user_id = self.emails.get(email.lower())
+        return self.users[user_id].model_copy() if user_id else None
+
+    async def fetch_user_by_id(self, db, user_id: str) -> Optional[UserInDB]:
+        user = self.users.get(user_id)
+        return user.model_copy() if user else None
+
+    async def insert_user(self, db, user_id, name, email, password_hash, company_name, role="user"):
+        if email.lower() in self.emails:
+            return None
+        now = _now()
+        user = UserInDB(
+            id=user_id, name=name, email=email, password_hash=password_hash,
+            company_name=company_name, role=role, created_at=now, updated_at=now,
+        )
+        self.users[user_id] = user
+        self.emails[email.lower()] = user_id
+        return user.model_copy()
+
+    async def bulk_insert_users(self, db, rows) -> List[str]:
+        taken = []
+        for user_id, name, email, password_hash, company_name in rows:
+            if await self.insert_user(db, user_id, name, email, password_hash, company_name) is None:
+                taken.append(email)
+        return taken
+
+    async def stream_users(self, db, batch_size: int):
+        users = list(self.users.values())
+        for start in range(0, len(users), batch_size):
+            yield [user.model_dump(include=set(EXPORT_COLUMNS)) for user in users[start:start + batch_size]]
+
+    async def update_password_hash(self, db, user_id: str, password_hash: str):
+        self.users[user_id].password_hash = password_hash
+        self.users[user_id].updated_at = _now()
+
+    async def replace_password_hash(self, db, user_id: str, old_hash: str, new_hash: str) -> bool:
+        user = self.users.get(user_id)
+        if user is None or user.password_hash != old_hash:
+            return False
+        user.password_hash = new_hash
+        user.updated_at = _now()
+        return True
+
+    async def mark_email_verified(self, db, user_id: str):
+        user = self.users.get(user_id)
+        if user is not None and not user.is_verified:
+            user.is_verified = True
+            user.updated_at = _now()
+
+    async def bulk_update_last_login(self, db, user_ids: List[str], timestamps: List[datetime]):
+        for user_id, ts in zip(user_ids, timestamps):
+            if user_id in self.users:
+                self.users[user_id].last_login = ts
+                self.users[user_id].updated_at = _now()
+
+    async def insert_refresh_token(self, db, user_id: str, token_hash: bytes, ttl: timedelta):
+        self.tokens[token_hash] = {"user_id": user_id, "expires_at": _now() + ttl, "is_revoked": False}
+
+    async def fetch_refresh_token_owner(self, db, token_hash: bytes) -> Optional[str]:
+        row = self.tokens.get(token_hash)
+        if not row or row["is_revoked"] or row["expires_at"] <= _now():
+            return None
+        return row["user_id"]
+
+    async def revoke_refresh_token(self, db, token_hash: bytes):
+        if token_hash in self.tokens:
+            self.tokens[token_hash]["is_revoked"] = True
+
+    async def rotate_refresh_token(self, db, user_id, old_hash, new_hash, ttl) -> Tuple[Optional[str], bool]:
+        row = self.tokens.get(old_hash)
+        if not row or row["user_id"] != user_id:
+            return None, False
+        if row["is_revoked"]:
+            for other in self.tokens.values():
+                if other["user_id"] == user_id:
+                    other["is_revoked"] = True
+            return None, True
+        user = self.users.get(user_id)
+        if row["expires_at"] <= _now() or not user or not user.is_active:
+            return None, False
+        row["is_revoked"] = True
+        await self.insert_refresh_token(db, user_id, new_hash, ttl)
+        return user.email, False
+
+    async def bump_session_generation(self, db, user_id: str) -> Optional[int]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        user.session_generation += 1
+        user.updated_at = _now()
+        for row in self.tokens.values():
+            if row["user_id"] == user_id:
+                row["is_revoked"] = True
+        return user.session_generation
+
+    async def purge_refresh_tokens(self, db, revoked_retention: timedelta, batch_size: int) -> int:
+        return 0
+
+    async def enqueue_intake(self, db, idempotency_key: str, kind: str, payload: dict) -> bool:
+        if idempotency_key in self.intake_keys:
+            return False
+        row_id = len(self.intake) + 1
+        self.intake_keys[idempotency_key] = row_id
+        self.intake[row_id] = {"kind": kind, "payload": payload, "status": "pending", "attempts": 0,
+                               "done": [], "available_at": _now(), "processed_at": None}
+        return True
+
+    async def claim_intake(self, db, batch_size: int, lease: timedelta) -> List[IntakeItem]:
+        now = _now()
+        due = [i for i, row in self.intake.items() if row["status"] == "pending" and row["available_at"] <= now]
+        claimed = []
+        for row_id in due[:batch_size]:
+            row = self.intake[row_id]
+            row["available_at"] = now + lease
+            row["attempts"] += 1
+            claimed.append(IntakeItem(row_id, row["kind"], row["payload"], row["attempts"], list(row["done"])))
+        return claimed
+
+    async def finish_intake(self, db, results: List[IntakeResult]):
+        now = _now()
+        for result in results:
+            self.intake[result.id].update(
+                status=result.status, done=result.done, last_error=result.error,
+                available_at=now + result.retry_in, processed_at=None if result.status == "pending" else now,
+            )
+
+    async def purge_intake(self, db, retention: timedelta, batch_size: int) -> int:
+        return 0
+
+
+class MemoryOutbox:
+    """Collects queued mail in place of the SMTP dispatcher"""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, msg, attempt: int = 0) -> bool:
+        self.messages.append(msg)
+        return True
+
+
+def stub_mail() -> MemoryOutbox:
+    """Route everything sent through backend.utils.mailer.mail_dispatcher into a MemoryOutbox"""
+    outbox = MemoryOutbox()
+    mailer.mail_dispatcher.enqueue = outbox.enqueue
+    return outbox
@@ -0,0 +1,74 @@
+# bench/passwords.py
+"""
+Password policy microbenchmark
+
+    python -m bench.passwords --iterations 50000 --breached 1000000
+
+Times the old four-regex validator against the single-pass rules, then the
+full check with a breached-password filter of --breached entries built in a
+temporary directory, and reports how long opening the filter takes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from backend.utils import password_policy
+
+SAMPLES = ["Passw0rdX", "correct-Horse-battery-staple-9", "Tr0ub4dor&3", "aB3" * 20, "Summer2024!"]
+
+
+def legacy_validate(v: str) -> str:
+    """The validator UserRegister used before backend.utils.password_policy"""
+    if len(v) < 8:
+        raise ValueError('Password must be at least 8 characters long')
+    if not re.search(r'[A-Z]', v):
+        raise ValueError('Password must contain at least one uppercase letter')
+    if not re.search(r'[a-z]', v):
+        raise ValueError('Password must contain at least one lowercase letter')
+    if not re.search(r'\d', v):
+        raise ValueError('Password must contain at least one number')
+    return v
+
+
+def _per_op_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(SAMPLES[i % len(SAMPLES)])
+    return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.passwords", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--breached", type=int, default=1_000_000, help="entries in the generated filter")
+    args = parser.parse_args(argv)
+
+    results = {
+        "legacy_regex_us": _per_op_us(legacy_validate, args.iterations),
+        "single_pass_rules_us": _per_op_us(password_policy.check_password, args.iterations),
+    }
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "breached.bloom")
+    start = time.perf_counter()
+    digests = (hashlib.sha1(f"breached-{i}".encode()).digest() for i in range(args.breached))
+    password_policy.build_filter(digests, args.breached, path).close()
+    results["filter_build_s"] = round(time.perf_counter() - start, 2)
+    results["filter_mib"] = round(os.path.getsize(path) / 2**20, 2)
+
+    breached = password_policy.BreachedPasswords(path)
+    start = time.perf_counter()
+    "warm-up" in breached
+    results["filter_open_us"] = round((time.perf_counter() - start) * 1e6, 1)
+    password_policy.breached_passwords = breached
+    results["rules_and_filter_us"] = _per_op_us(password_policy.check_password, args.iterations)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench/runner.py
+"""
+Drive the auth API in-process through httpx's ASGI transport
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import httpx
+
+from bench import timing
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.breakdown = dict.fromkeys(timing.CATEGORIES, 0.0)
+        self.wall = 0.0
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        ms = lambda seconds: round(seconds * 1000, 3)
+        breakdown = {k: ms(v / count) if count else 0.0 for k, v in self.breakdown.items()}
+        mean = sum(latencies) / count if count else 0.0
+        breakdown["other"] = round(max(0.0, ms(mean) - sum(breakdown.values())), 3)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "throughput_rps": round(count / self.wall, 1) if self.wall else 0.0,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "mean_breakdown_ms": breakdown,
+        }
+
+
+async def _drive(client: httpx.AsyncClient, concurrency: int, items: list,
+                 send: Callable, stats: EndpointStats, expected: int) -> list:
+    """Send one request per item with at most ``concurrency`` in flight; returns parsed bodies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(items)
+
+    async def one(index, item):
+        async with semaphore:
+            timings = timing.begin()
+            start = time.perf_counter()
+            response = await send(client, item)
+            stats.latencies.append(time.perf_counter() - start)
+            for category, value in timings.items():
+                stats.breakdown[category] += value
+            if response.status_code != expected:
+                stats.errors += 1
+            else:
+                results[index] = response.json()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(one(i, item)) for i, item in enumerate(items)))
+    stats.wall = time.perf_counter() - start
+    return results
+
+
+async def run(app, concurrency: int, users: int, repeat: int) -> Dict[str, dict]:
+    """Register, log in, refresh and read profiles for ``users`` accounts"""
+    stats = {name: EndpointStats() for name in ("register", "login", "refresh", "me", "verify-token")}
+    password = "BenchPass123"
+    run_id = uuid.uuid4().hex[:8]
+    accounts = [
+        {"name": "Bench User", "email": f"bench-{run_id}-{i}@example.com", "password": password}
+        for i in range(users)
+    ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await _drive(client, concurrency, accounts,
+                     lambda c, a: c.post("/api/auth/register", json=a), stats["register"], 201)
+
+        tokens = await _drive(
+            client, concurrency, accounts,
+            lambda c, a: c.post("/api/auth/login", json={"email": a["email"], "password": a["password"]}),
+            stats["login"], 200,
+        )
+        tokens = [t for t in tokens if t]
+
+        bearer = lambda t: {"Authorization": f"Bearer {t['access_token']}"}
+        reads = tokens * repeat
+        await _drive(client, concurrency, reads,
+                     lambda c, t: c.get("/api/auth/me", headers=bearer(t)), stats["me"], 200)
+        await _drive(client, concurrency, reads,
+                     lambda c, t: c.get("/api/auth/verify-token", headers=bearer(t)),
+                     stats["verify-token"], 200)
+
+        await _drive(client, concurrency, tokens,
+                     lambda c, t: c.post("/api/auth/refresh", json={"refresh_token": t["refresh_token"]}),
+                     stats["refresh"], 200)
+
+    return {name: s.summary() for name, s in stats.items()}
@@ -0,0 +1,70 @@
+# bench/serialization.py
+"""
+Response serialization microbenchmark
+
+    python -m bench.serialization --iterations 20000
+
+Times building a /me response the way FastAPI does for a response_model
+route against serializing the stored record straight to bytes.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend.models.user import UserInDB, UserResponse
+from backend.utils.responses import user_json
+
+
+def _user() -> UserInDB:
+    now = datetime.now(timezone.utc)
+    return UserInDB(
+        id="3f0c5b8e-2a9d-4c59-9f0e-7d7c2b9a4e11", name="Bench User", email="bench@example.com",
+        password_hash="$2b$12$" + "x" * 53, company_name="ChiefAI", role="user",
+        is_verified=True, is_active=True, created_at=now, last_login=now, updated_at=now,
+    )
+
+
+def _per_op_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    user = _user()
+    adapter = TypeAdapter(UserResponse)
+
+    def response_model_encoder():
+        # Handler builds the model, FastAPI re-validates it and renders via jsonable_encoder
+        model = UserResponse.model_validate(user)
+        JSONResponse(jsonable_encoder(adapter.validate_python(model, from_attributes=True)))
+
+    def response_model_pydantic():
+        # Newer FastAPI: re-validate, then pydantic dumps straight to bytes
+        model = UserResponse.model_validate(user)
+        adapter.dump_json(adapter.validate_python(model, from_attributes=True))
+
+    def direct():
+        user_json(user)
+
+    results = {
+        "response_model_jsonable_encoder_us": _per_op_us(response_model_encoder, args.iterations),
+        "response_model_pydantic_json_us": _per_op_us(response_model_pydantic, args.iterations),
+        "direct_orjson_us": _per_op_us(direct, args.iterations),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench/startup.py
+"""
+Worker cold-start profile
+
+    python -m bench.startup --runs 5 --top 15
+    python -m bench.startup --budget 1.0    # exit 1 if the median import exceeds it (CI)
+
+Imports backend.main and builds the app with create_app() in fresh
+interpreters with -X importtime, and reports the median import time plus the slowest modules,
+by their own time and including their imports.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "1.0"))
+
+CHILD = (
+    "import time; t = time.perf_counter(); import backend.main; backend.main.create_app(); "
+    "print(time.perf_counter() - t)"
+)
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once() -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """(seconds to import backend.main and build the app, {module: (self us, cumulative us)}) from one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def _table(title: str, rows: List[Tuple[str, float]]):
+    print(f"\n{title}")
+    for name, us in rows:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS,
+                        help="seconds allowed for importing backend.main and building the app "
+                             "(default STARTUP_IMPORT_BUDGET_SECONDS)")
+    args = parser.parse_args(argv)
+
+    totals = []
+    self_times: Dict[str, List[int]] = defaultdict(list)
+    cumulative: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        seconds, modules = profile_once()
+        totals.append(seconds)
+        for name, (own, total) in modules.items():
+            self_times[name].append(own)
+            cumulative[name].append(total)
+
+    median = lambda values: statistics.median(values)
+    by_self = sorted(((n, median(v)) for n, v in self_times.items()), key=lambda r: r[1], reverse=True)
+    # Top-level packages only, so the cumulative list is not just one import chain repeated
+    by_package = sorted(
+        ((n, median(v)) for n, v in cumulative.items() if "." not in n or n.startswith("backend.")),
+        key=lambda r: r[1], reverse=True,
+    )
+    _table(f"Slowest modules (self time, median of {args.runs})", by_self[:args.top])
+    _table("Slowest packages (including their imports)", by_package[:args.top])
+
+    boot = median(totals)
+    print(f"\nimport backend.main + create_app(): {boot * 1000:.0f} ms median, budget {args.budget * 1000:.0f} ms")
+    if boot > args.budget:
+        print("❌ Over the startup budget")
+        sys.exit(1)
+    print("✅ Within the startup budget")
+
+
+if __name__ == "__main__":
+    main()
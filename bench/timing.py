@@ -0,0 +1,71 @@
+# bench/timing.py
+"""
+Per-request time attribution for benchmarks
+
+Wraps the bcrypt, JWT and database entry points so every request driven by
+the runner records how long it spent in each of them.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+CATEGORIES = ("bcrypt", "jwt", "db")
+
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("bench_timings", default=None)
+
+
+def begin() -> Dict[str, float]:
+    """Start collecting timings for the request about to be sent from this task"""
+    timings = dict.fromkeys(CATEGORIES, 0.0)
+    _current.set(timings)
+    return timings
+
+
+def _record(category: str, elapsed: float):
+    timings = _current.get()
+    if timings is not None:
+        timings[category] += elapsed
+
+
+def timed(fn, category: str):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _record(category, time.perf_counter() - start)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(category, time.perf_counter() - start)
+    return wrapper
+
+
+class _TimedJWT:
+    def __init__(self, jwt):
+        self.encode = timed(jwt.encode, "jwt")
+        self.decode = timed(jwt.decode, "jwt")
+        self.get_unverified_header = timed(jwt.get_unverified_header, "jwt")
+
+
+def install():
+    """Patch the hot paths; call after the storage backend has been selected"""
+    from backend.database.storage import OPERATIONS, get_storage
+    from backend.utils import auth
+    from backend.utils.hashing import password_hasher
+
+    password_hasher.hash = timed(password_hasher.hash, "bcrypt")
+    password_hasher.verify = timed(password_hasher.verify, "bcrypt")
+    auth.jwt = _TimedJWT(auth.jwt)
+    storage = get_storage()
+    for name in OPERATIONS:
+        setattr(storage, name, timed(getattr(storage, name), "db"))
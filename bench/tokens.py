@@ -0,0 +1,66 @@
+# bench/tokens.py
+"""
+JWT encode/decode microbenchmark
+
+    python -m bench.tokens --iterations 5000
+
+Times create_access_token, a cold decode_token (full signature and claims
+check) and a cached decode_token for HS256 and ES256.
+"""
+
+import argparse
+import json
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk
+
+from backend.utils import auth
+from backend.utils.keys import KeyRing
+
+
+def _es256_ring() -> KeyRing:
+    pem = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    key = jwk.construct(pem, "ES256")
+    return KeyRing("ES256", "bench", key, {"bench": key.public_key()})
+
+
+def _per_op_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return round((time.perf_counter() - start) / len(items) * 1e6, 2)
+
+
+def measure(ring: KeyRing, iterations: int) -> dict:
+    auth.key_ring = ring
+    auth.token_cache.clear()
+    claims = [{"sub": f"user-{i}", "email": f"user-{i}@example.com"} for i in range(iterations)]
+    tokens = [auth.create_access_token(c) for c in claims]
+    return {
+        "encode_us": _per_op_us(auth.create_access_token, claims),
+        "decode_cold_us": _per_op_us(auth.decode_token, tokens),
+        "decode_cached_us": _per_op_us(auth.decode_token, tokens),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.tokens", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    original = auth.key_ring
+    auth.token_cache.maxsize = max(auth.token_cache.maxsize, args.iterations)
+    try:
+        results = {ring.algorithm: measure(ring, args.iterations) for ring in (original, _es256_ring())}
+    finally:
+        auth.key_ring = original
+        auth.token_cache.clear()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()